@@ -0,0 +1,105 @@
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+from stage_manifest import StageManifest, MANIFEST_DIR
+
+
+def process_object(name, size, gen_dir, frame_dir, output_dir, threshold=30, manifest_dir=MANIFEST_DIR, vote_ratio=None):
+    # Heavy imports happen in the worker so that the BLAS thread limits set in __main__ apply
+    import cv2
+    from related_code.dilate import dilate_mask
+    from utils.carve_utils import load_colmap_cameras, load_packed_masks, carve_mesh
+
+    cv2.setNumThreads(1)
+
+    # Every object works inside its own folder, nothing is copied to ./images, ./masks or ./dilate_mask
+    object_dir = os.path.join(gen_dir, name)
+    mask_folder = os.path.join(object_dir, 'masks')
+    dilate_folder = os.path.join(object_dir, 'dilate_mask')
+    ply_file_path = os.path.join(object_dir, 'output/train/ours_30000/fuse_post.ply')
+    new_file_path = os.path.join(output_dir, f"{name}_ps.ply")
+
+    sparse_path = os.path.join(object_dir, 'data/sparse/0')
+    manifest = StageManifest(name, manifest_dir)
+
+    # Each stage is skipped when its inputs and parameters are unchanged since the last run
+    binary_masks = None
+    dilate_params = {'size': size, 'threshold': threshold}
+    if not manifest.is_done('dilate', [mask_folder], dilate_params, [dilate_folder]):
+        # The dilated masks are handed to carving in memory, dilate_mask/ is only written for later runs
+        binary_masks = dilate_mask(mask_folder, dilate_folder, size, threshold, workers=1, return_masks=True)
+        manifest.record('dilate', [mask_folder], dilate_params, [dilate_folder])
+
+    carve_inputs = [dilate_folder, ply_file_path, sparse_path]
+    carve_params = {'threshold': threshold}
+    # Only present when set, so the manifests of earlier runs without vote carving stay valid
+    if vote_ratio is not None:
+        carve_params['vote_ratio'] = vote_ratio
+    if not manifest.is_done('carve', carve_inputs, carve_params, [new_file_path]):
+        cam_infos = load_colmap_cameras(sparse_path, os.path.join(frame_dir, name))
+        if binary_masks is None:
+            binary_masks = load_packed_masks(dilate_folder, threshold)
+        carve_mesh(ply_file_path, cam_infos, binary_masks, vote_ratio, output_file_path=new_file_path)
+        manifest.record('carve', carve_inputs, carve_params, [new_file_path])
+    return new_file_path
+
+
+def process_objects(names, size, workers, gen_dir='./2dgs_gen', frame_dir='./frame', output_dir='./mesh_ply',
+                    manifest_dir=MANIFEST_DIR, vote_ratio=None):
+    os.makedirs(output_dir, exist_ok=True)
+    failed = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=len(names), desc="Processing:", unit="object") as pbar:
+        futures = {executor.submit(process_object, name, size, gen_dir, frame_dir, output_dir,
+                                   manifest_dir=manifest_dir, vote_ratio=vote_ratio): name
+                   for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                new_file_path = future.result()
+                pbar.write(f"√ Done：{name} -> {new_file_path}")
+            except Exception as e:
+                failed[name] = f"{type(e).__name__}: {e}"
+                pbar.write(f"× Failed：{name} ({failed[name]})")
+            finally:
+                pbar.update(1)
+
+    with open('progress.log', 'a') as log:
+        log.write(f"Background removal finished, {len(names) - len(failed)}/{len(names)} objects succeeded\n")
+        for name, reason in failed.items():
+            log.write(f"  - {name}: {reason}\n")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove the background of every object in 2dgs_gen in parallel.")
+    parser.add_argument('-s', '--size', type=int, default=50, help="Size of dilate kernel.")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument('-n', '--names', nargs='+', help="Only process these objects.")
+    parser.add_argument('--gen_dir', type=str, default='./2dgs_gen', help="Folder holding one folder per object.")
+    parser.add_argument('--frame_dir', type=str, default='./frame', help="Folder holding the extracted frames.")
+    parser.add_argument('--output_dir', type=str, default='./mesh_ply', help="Folder to save the carved meshes.")
+    parser.add_argument('--skip_existing', action='store_true', help="Skip objects whose _ps.ply already exists.")
+    parser.add_argument('--manifest_dir', type=str, default=MANIFEST_DIR, help="Folder holding the per-object stage manifests.")
+    parser.add_argument('--vote_ratio', type=float, default=None, help="Keep a vertex if at least this fraction of the cameras seeing it mark it foreground (0-1). By default one background vote removes it.")
+    args = parser.parse_args()
+    if args.vote_ratio is not None and not 0 <= args.vote_ratio <= 1:
+        parser.error("--vote_ratio must be between 0 and 1")
+
+    # One process per object, so keep each of them single threaded
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(var, '1')
+
+    names = args.names or sorted(d for d in os.listdir(args.gen_dir) if os.path.isdir(os.path.join(args.gen_dir, d)))
+    if args.skip_existing:
+        names = [name for name in names if not os.path.exists(os.path.join(args.output_dir, f"{name}_ps.ply"))]
+
+    if not names:
+        print("No object to process")
+    else:
+        failed = process_objects(names, args.size, args.workers, args.gen_dir, args.frame_dir, args.output_dir,
+                                 args.manifest_dir, args.vote_ratio)
+        if failed:
+            raise SystemExit(1)
@@ -1,43 +1,83 @@
 import os
-import subprocess
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
+from stage_manifest import StageManifest, MANIFEST_DIR
 
 
-def process_videos():
-    video_dir = os.path.join('.', 'video')
-    output_dir = os.path.join('.', 'frame')
+def process_video(input_path, output_dir, target_frame_count=150, mode='grab', jpeg_quality=95, max_dimension=None,
+                  manifest_dir=MANIFEST_DIR):
+    # OpenCV is imported in the worker so that every process limits its own thread pool
+    import cv2
+    from related_code.video_process import extract_images
 
+    cv2.setNumThreads(1)
+    video_name = os.path.splitext(os.path.basename(input_path))[0]
+    frame_path = os.path.join(output_dir, video_name)
+    params = {'target_frame_count': target_frame_count, 'mode': mode, 'jpeg_quality': jpeg_quality,
+              'max_dimension': max_dimension}
+    manifest = StageManifest(video_name, manifest_dir)
+    if manifest.is_done('frames', [input_path], params, [frame_path]):
+        return len(os.listdir(frame_path))
+
+    # Frames go to <output_dir>/<video name>/, nothing is copied to ./sugar/data/input
+    extracted_count = extract_images(input_path, output_dir, target_frame_count, mode, jpeg_quality=jpeg_quality,
+                                     max_dimension=max_dimension)
+    if extracted_count:
+        manifest.record('frames', [input_path], params, [frame_path])
+    return extracted_count
+
+
+def process_videos(video_dir='./video', output_dir='./frame', workers=os.cpu_count(), target_frame_count=150,
+                   mode='grab', jpeg_quality=95, max_dimension=None, manifest_dir=MANIFEST_DIR):
     os.makedirs(output_dir, exist_ok=True)
 
-    video_files = [f for f in os.listdir(video_dir) if f.lower().endswith('.mp4')]
+    video_files = sorted(f for f in os.listdir(video_dir) if f.lower().endswith('.mp4'))
 
     if not video_files:
         print("MP4 Video File Not Found")
-        return
-
-    with tqdm(total=len(video_files), desc="Processing:", unit="video") as pbar:
-        for video_file in video_files:
-            input_path = os.path.join(video_dir, video_file)
-
-            command = [
-                'python',
-                'video_process.py',
-                '-i', input_path,
-                '-o', output_dir,
-                '-t', '150'
-            ]
+        return {}
 
+    failed = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=len(video_files), desc="Processing:", unit="video") as pbar:
+        futures = {executor.submit(process_video, os.path.join(video_dir, video_file), output_dir,
+                                   target_frame_count, mode, jpeg_quality, max_dimension, manifest_dir): video_file
+                   for video_file in video_files}
+        for future in as_completed(futures):
+            video_file = futures[future]
             try:
-                subprocess.run(command, check=True)
-                pbar.set_postfix_str(f"Current：{video_file}", refresh=False)
-
-            except subprocess.CalledProcessError as e:
-                pbar.write(f"× Failed：{video_file} (Error Code: {e.returncode})")
+                extracted_count = future.result()
+                if extracted_count == 0:
+                    raise IOError("no frame could be read")
+                pbar.write(f"√ Done：{video_file} ({extracted_count} frames)")
             except Exception as e:
-                pbar.write(f"× Error：{video_file} ({str(e)})")
+                failed[video_file] = f"{type(e).__name__}: {e}"
+                pbar.write(f"× Failed：{video_file} ({failed[video_file]})")
             finally:
                 pbar.update(1)
 
+    if failed:
+        print(f"{len(failed)}/{len(video_files)} videos failed:")
+        for video_file, reason in failed.items():
+            print(f"  - {video_file}: {reason}")
+    return failed
+
 
 if __name__ == "__main__":
-    process_videos()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract frames from every video in parallel.")
+    parser.add_argument('-i', '--video_dir', type=str, default='./video', help="Folder holding the input videos.")
+    parser.add_argument('-o', '--output_dir', type=str, default='./frame', help="Folder to save the extracted frames.")
+    parser.add_argument('-t', '--target_frame_count', type=int, default=150, help="Target number of frames per video.")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument('-m', '--mode', type=str, default='grab', choices=['read', 'grab', 'seek', 'sharp'],
+                        help="Frame sampling mode, see related_code/video_process.py.")
+    parser.add_argument('-q', '--jpeg_quality', type=int, default=95, help="JPEG quality of the saved frames.")
+    parser.add_argument('--max_dimension', type=int, default=None, help="Downscale frames whose longer side exceeds this.")
+    parser.add_argument('--manifest_dir', type=str, default=MANIFEST_DIR, help="Folder holding the per-object stage manifests.")
+    args = parser.parse_args()
+
+    failed = process_videos(args.video_dir, args.output_dir, args.workers, args.target_frame_count, args.mode,
+                            args.jpeg_quality, args.max_dimension, args.manifest_dir)
+    if failed:
+        raise SystemExit(1)
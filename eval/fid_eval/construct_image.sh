@@ -140,6 +140,10 @@ process_folder() {
 
 MODE="specific"  # 修改这里来切换处理模式
 
+# 仓库根目录，process_image.py 从这里导入 utils/composite_utils.py
+# 默认取本脚本上两级目录；把 fid_eval 复制到 project/fid_eval 后需改为仓库所在路径（或在运行前设置 REPO_ROOT）
+REPO_ROOT="${REPO_ROOT:-$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)}"
+
 # 当MODE="specific"时，在下面的数组中指定要处理的文件夹名字
 SPECIFIC_FOLDERS=(
 "plant"
@@ -177,6 +181,12 @@ main() {
         print_error "未找到 process_image.py 脚本"
         exit 1
     fi
+
+    if [ ! -f "$REPO_ROOT/utils/composite_utils.py" ]; then
+        print_error "未找到 $REPO_ROOT/utils/composite_utils.py，请在配置区域设置 REPO_ROOT 为仓库根目录"
+        exit 1
+    fi
+    export PYTHONPATH="$REPO_ROOT${PYTHONPATH:+:$PYTHONPATH}"
     
     # 检查Blender是否存在
     if [ ! -f "/opt/blender-2.90.0-linux64/blender" ]; then
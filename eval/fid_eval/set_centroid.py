@@ -2,8 +2,8 @@ import numpy as np
 import os
 
 
-def center_mesh(input_path, output_path):
-    """将网格的重心移动到坐标系原点，支持 PLY 和 OBJ 格式"""
+def center_mesh(input_path, output_path, text=False):
+    """将网格的重心移动到坐标系原点，支持 PLY 和 OBJ 格式；PLY 默认写为二进制小端格式，text=True 时写为 ASCII"""
 
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"输入文件不存在: {input_path}")
@@ -11,17 +11,17 @@ def center_mesh(input_path, output_path):
     ext = os.path.splitext(input_path)[1].lower()
 
     if ext == '.ply':
-        center_ply(input_path, output_path)
+        center_ply(input_path, output_path, text=text)
     elif ext == '.obj':
         center_obj(input_path, output_path)
     else:
         raise ValueError(f"不支持的格式: {ext}。仅支持 .ply 和 .obj 文件")
 
 
-def center_ply(input_path, output_path):
+def center_ply(input_path, output_path, text=False):
     """处理 PLY 格式文件"""
     try:
-        from plyfile import PlyData, PlyElement
+        from plyfile import PlyData
     except ImportError:
         raise ImportError("处理 PLY 需要 plyfile 库。请运行: pip install plyfile")
 
@@ -49,7 +49,7 @@ def center_ply(input_path, output_path):
     vertices['z'] = vert_coords[:, 2]
 
     # 保存新文件
-    PlyData(ply_data.elements).write(output_path)
+    PlyData(ply_data.elements, text=text, byte_order='<').write(output_path)
     print(f"中心化 PLY 已保存至: {output_path}")
 
     # 验证新重心
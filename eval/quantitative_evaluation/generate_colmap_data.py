@@ -1,6 +1,6 @@
 import re
 import numpy as np
-from scene.colmap_loader import rotmat2qvec
+from scene.colmap_loader import rotmat2qvec_batch
 
 def parse_camera_poses(file_path):
     frame_pattern = re.compile(r"\[Frame \d+: .*?name:\S+\.png\]", re.DOTALL)
@@ -24,6 +24,9 @@ def parse_camera_poses(file_path):
     frames = frame_pattern.findall(content)
 
     results = []
+    # The quaternions of all frames are computed in one batch after the loop
+    rotated = []
+    rotations = []
 
     for frame in frames:
         data = {}
@@ -55,8 +58,9 @@ def parse_camera_poses(file_path):
 
             R = np.array(R)
             RX = np.linalg.inv(R)
-            qvec = rotmat2qvec(RX)
-            data["qvec"] = qvec.tolist()
+            data["qvec"] = None
+            rotated.append(data)
+            rotations.append(RX)
 
 
         location_match = location_pattern.search(frame)
@@ -90,6 +94,10 @@ def parse_camera_poses(file_path):
 
         results.append(data)
 
+    if rotations:
+        for data, qvec in zip(rotated, rotmat2qvec_batch(np.stack(rotations))):
+            data["qvec"] = qvec.tolist()
+
     return results
 
 def save_camera_poses_to_images_txt(camera_poses_data, output_file):
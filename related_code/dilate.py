@@ -2,37 +2,74 @@ import cv2 as cv
 import numpy as np
 import os
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 input_folder = 'masks'
 output_folder = 'dilate_mask'
 
 
-def dilate_mask(input_folder, output_folder, size):
-    os.makedirs(output_folder, exist_ok=True)
+def _dilate_square(binary_mask, radius):
+    # Chessboard distance of every pixel to the nearest foreground pixel, foreground pixels are the zeros
+    distance = cv.distanceTransform(np.where(binary_mask > 0, 0, 255).astype(np.uint8), cv.DIST_C, 3)
+    return (distance <= radius).astype(np.uint8)
 
-    file_names = os.listdir(input_folder)
 
-    k = np.ones((size, size), np.uint8)
+def dilate_binary(binary_mask, size):
+    """
+    Same result as cv.dilate with an size x size box kernel and two iterations, computed from a
+    distance transform so that the cost does not grow with size.
+    """
+    if size <= 1:
+        return binary_mask.copy()
+    if size % 2 == 0:
+        # cv.dilate anchors an even kernel one pixel off center, which shifts the footprint by one pixel
+        padded = np.pad(binary_mask, ((1, 0), (1, 0)))
+        return _dilate_square(padded, size - 1)[:-1, :-1]
+    return _dilate_square(binary_mask, size - 1)
 
-    for file_name in file_names:
-        input_path = os.path.join(input_folder, file_name)
-        output_path = os.path.join(output_folder, file_name)
 
-        image = cv.imread(input_path)
+def _dilate_file(input_path, output_path, size, threshold):
+    image = cv.imread(input_path, cv.IMREAD_GRAYSCALE)
+    if image is None:
+        print(f"Unable load file in path: {input_path}")
+        return None
+    dilated_mask = dilate_binary((image > threshold).astype(np.uint8), size)
+    if output_path is not None:
+        cv.imwrite(output_path, dilated_mask * 255)
+    return dilated_mask
 
-        if image is not None:
-            dilated_image = cv.dilate(image, k, iterations=2)
 
-            cv.imwrite(output_path, dilated_image)
-        else:
-            print(f"Unable load file in path: {input_path}")
+def dilate_mask(input_folder, output_folder, size, threshold=30, workers=None, return_masks=False):
+    """
+    Threshold every mask (grayscale > threshold) and dilate it, on a thread pool. The results are
+    written as 0/255 PNGs to output_folder unless it is None.
+    :param return_masks: also return the dilated 0/1 masks keyed by file name without extension,
+        fully zero masks left out, in the format of utils.carve_utils.load_binary_masks.
+    """
+    if output_folder is not None:
+        os.makedirs(output_folder, exist_ok=True)
+
+    file_names = sorted(f for f in os.listdir(input_folder) if os.path.isfile(os.path.join(input_folder, f)))
+    input_paths = [os.path.join(input_folder, file_name) for file_name in file_names]
+    output_paths = [os.path.join(output_folder, file_name) if output_folder is not None else None
+                    for file_name in file_names]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        dilated_masks = list(executor.map(_dilate_file, input_paths, output_paths,
+                                          [size] * len(file_names), [threshold] * len(file_names)))
 
     print("All masks have been dilated.")
 
+    if return_masks:
+        return {os.path.splitext(file_name)[0]: mask for file_name, mask in zip(file_names, dilated_masks)
+                if mask is not None and np.any(mask)}
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="rgb process.")
     parser.add_argument('-s', '--size', type=int, default= 10, help="Size of dilate kernel.")
+    parser.add_argument('-t', '--threshold', type=int, default=30, help="Grayscale values above this are foreground.")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Number of threads.")
     args = parser.parse_args()
 
-    dilate_mask(input_folder, output_folder, args.size)
+    dilate_mask(input_folder, output_folder, args.size, args.threshold, args.workers)
@@ -4,7 +4,7 @@ from plyfile import PlyData, PlyElement
 from utils.sh_utils import SH2RGB
 
 
-def rgb_process(input_path, output_path):
+def rgb_process(input_path, output_path, text=False):
 
     ply_data = PlyData.read(f"{input_path}/point_cloud.ply")
 
@@ -33,7 +33,7 @@ def rgb_process(input_path, output_path):
     elements = [element for element in ply_data.elements if element.name != 'vertex']
     elements.append(new_vertex_element)
 
-    new_ply_data = PlyData(elements, text=ply_data.text)
+    new_ply_data = PlyData(elements, text=text, byte_order='<')
 
     new_ply_data.write(f"{output_path}/colored_points.ply")
 
@@ -41,7 +41,8 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="rgb process.")
     parser.add_argument('-i', '--input_path', type=str, default= './output/iteration_60000', help="Path to the input video file.")
     parser.add_argument('-o', '--output_path', type=str, default= './output/iteration_60000', help="Folder to save the extracted frames.")
+    parser.add_argument('--ascii', action='store_true', help="Write an ASCII PLY instead of binary little-endian.")
 
     args = parser.parse_args()
 
-    rgb_process(args.input_path, args.output_path)
+    rgb_process(args.input_path, args.output_path, text=args.ascii)
@@ -1,188 +1,34 @@
-import numpy as np
 import argparse
-import open3d as o3d
-from plyfile import PlyData, PlyElement, PlyProperty
-from PIL import Image
 import os
-import cv2
-import re
-from scene.colmap_loader import read_extrinsics_binary, read_intrinsics_binary
-from scene.dataset_readers import readColmapCameras
-from utils.graphics_utils import getWorld2View2, focal2fov, fov2focal, getWorld2View
+from utils.carve_utils import load_colmap_cameras, load_packed_masks, carve_mesh
 
 
-def load_point_cloud(ply_file_path):
-    pcd = PlyData.read(ply_file_path)
-    return pcd
-
-def save_point_cloud(vertices, faces, output_file_path):
-    vertex_element = PlyElement.describe(vertices, 'vertex')
-    # face_element = PlyElement.describe(faces, 'face')
-    face_element = PlyElement.describe(
-        np.array([([f[0], f[1], f[2]],) for f in faces], dtype=[('vertex_indices', 'i4', (3,))]),
-        'face'
-    )
-    PlyData([vertex_element, face_element], text=True).write(output_file_path)
-
 def process_masks(mask_folder_path):
-    masks_dict = {}
-    for mask_filename in sorted(os.listdir(mask_folder_path)):
-        mask_path = os.path.join(mask_folder_path, mask_filename)
-        if os.path.isfile(mask_path):
-            image = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
-            if image is None:
-                print("Failed to load the image from", mask_folder_path)
-                return None
-            _, binary_mask = cv2.threshold(image, 30, 1, cv2.THRESH_BINARY)
-            if np.any(binary_mask):
-                mask_name_without_ext = os.path.splitext(mask_filename)[0]
-                masks_dict[mask_name_without_ext] = binary_mask
-            else:
-                print("Binary mask is fully zero. Skipping:", mask_filename)
-    return masks_dict
-
-
-def get_mask_names(mask_folder_path):
-    mask_names = set()
-    for mask_filename in os.listdir(mask_folder_path):
-        if os.path.isfile(os.path.join(mask_folder_path, mask_filename)):
-            mask_name_without_ext = os.path.splitext(mask_filename)[0]
-            mask_names.add(mask_name_without_ext)
-    return mask_names
+    return load_packed_masks(mask_folder_path, threshold=30)
 
 
-def get_mask_files_number(mask_folder_path):
-    mask_files = [f for f in os.listdir(mask_folder_path) if os.path.isfile(os.path.join(mask_folder_path, f))]
-    return len(mask_files)
-
-
-def project_and_filter(cam_infos, binary_masks, new_file_path):
-    mask_names = get_mask_names(mask_folder_path)
+def project_and_filter(cam_infos, binary_masks, ply_file_path, new_file_path, text=False, vote_ratio=None):
     print("---------------------------------------------------------------------------------------------")
-    times = 0
-    for idx, camera, in enumerate(cam_infos):
-        camera = cam_infos[idx]
-        if camera.image_name not in mask_names:
-            continue
-
-        print("idx", idx)
-
-        if times < 1 :
-            pcd = load_point_cloud(ply_file_path)
-            vertices = np.array(pcd.elements[0].data)
-            faces = np.array(pcd.elements[1].data)
-            faces = np.stack((faces["vertex_indices"]))
-            print("vertices1", vertices)
-            print("faces1", faces)
-        else:
-            vertices = filtered_points
-            faces = filtered_faces
-            print("vertices2", vertices)
-            print("faces2", faces)
-
-        properties = vertices.dtype.names
-        dtype_desc = [(prop, vertices[prop].dtype) for prop in properties]
-        test_points = np.array([vertices[prop] for prop in properties]).T
-
-
-
-
-        print("camera", camera)
-        no = camera.image_name
-        num_cameras = len(cam_infos)
-        print("There are", num_cameras, "items in cam_infos.")
-        print("In", idx, "times of iteration")
-        filtered_points = np.array([], dtype=dtype_desc)
-
-        mask = binary_masks[no]
-        print("The number of using mask：", no)
-        CAMERA_INTRINSICS = np.array([[camera.FocalX, 0, camera.width / 2],
-                                      [0, camera.FocalY, camera.height / 2],
-                                      [0, 0, 1]])
-        C2W = getWorld2View(camera.R, camera.T)
-
-        points = np.stack((vertices["x"], vertices["y"], vertices["z"]), axis=1)
-        points_homogeneous = np.hstack((points, np.ones((points.shape[0], 1))))
-        points_camera = (C2W @ points_homogeneous.T).T[:, :3]
-        print(f"image_name: {camera.image_name}")
-
-        pixels_homogeneous = CAMERA_INTRINSICS @ points_camera.T
-        pixels = np.vstack((pixels_homogeneous[0, :] / pixels_homogeneous[2, :],
-                            pixels_homogeneous[1, :] / pixels_homogeneous[2, :])).T
-
-        within_projection = ((pixels[:, 0] >= 0) & (pixels[:, 0] < mask.shape[1]) &
-                             (pixels[:, 1] >= 0) & (pixels[:, 1] < mask.shape[0]))
-
-        image_points_within_projection = pixels[within_projection].astype(np.int64)
-        mask_values = np.ones(points_camera.shape[0], dtype=bool)
-        mask_values[within_projection] = mask[image_points_within_projection[:, 1], image_points_within_projection[:,
-                                                                                    0]] == 1
-
-        filtered_points = test_points[mask_values]
-        filtered_points = np.array([tuple(row) for row in filtered_points], dtype=dtype_desc)
-
-
-        deleted_indices = np.where(~mask_values)[0]
-        print("deleted_indices", deleted_indices)
-        print("len(deleted_indices)", len(deleted_indices))
-        deleted_indices = np.array(deleted_indices)
-        mask = np.any(np.isin(faces, deleted_indices), axis=1)
-        print("mask", mask)
-        faces = faces[~mask]
-
-
-        new_vertex_indices = np.arange(vertices.shape[0])
-        new_vertex_indices = np.delete(new_vertex_indices, deleted_indices)
-        print("new_vertex_indices:", new_vertex_indices)
-        index_mapping = {old_idx: new_idx for new_idx, old_idx in enumerate(new_vertex_indices)}
-        print("index_mapping:", index_mapping)
-        filtered_faces = np.vectorize(index_mapping.get)(faces)
-        print("filtered_faces:", filtered_faces)
-        print("----------------------------------------------------------------------")
-        times += 1
-
-
-    save_point_cloud(filtered_points, filtered_faces, new_file_path)
+    print("There are", len(cam_infos), "items in cam_infos.")
+    filtered_points, filtered_faces = carve_mesh(ply_file_path, cam_infos, binary_masks, vote_ratio,
+                                                 output_file_path=new_file_path, text=text)
+    print(f"vertices: {filtered_points.shape[0]}, faces: {filtered_faces.shape[0]}")
+    print("----------------------------------------------------------------------")
     print(f"The point cloud is saved in {new_file_path}")
+    return filtered_points, filtered_faces
 
 
-
-path_to_images_bin = 'images.bin'
-path_to_cameras_bin = 'cameras.bin'
-path_to_cameras_extrinsic_file = "images.bin"
-path_to_cameras_intrinsic_file = "cameras.bin"
-images_folder = "images"
-ex_images_data = read_extrinsics_binary(path_to_images_bin)
-in_images_data = read_intrinsics_binary(path_to_cameras_bin)
-cam_extrinsics = read_extrinsics_binary(path_to_cameras_extrinsic_file)
-cam_intrinsics = read_intrinsics_binary(path_to_cameras_intrinsic_file)
-cam_infos = readColmapCameras(cam_extrinsics=cam_extrinsics, cam_intrinsics=cam_intrinsics, images_folder=images_folder)
-
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="run clean background")
     parser.add_argument('-i', '--input_file', type=str, help="Path to the input fply file.")
+    parser.add_argument('--ascii', action='store_true', help="Write an ASCII PLY instead of binary little-endian.")
+    parser.add_argument('--vote_ratio', type=float, default=None, help="Keep a vertex if at least this fraction of the cameras seeing it mark it foreground (0-1). By default one background vote removes it.")
 
     args = parser.parse_args()
 
-
-
-    camera_intrinsics = []
-    camera_extrinsics = []
-    for camera in cam_infos:
-        camera_intrinsics = {
-            'fx': camera.FocalX,
-            'fy': camera.FocalY,
-            'cx': camera.width / 2,
-            'cy': camera.height / 2
-        }
-
-        camera_extrinsics = [
-            {'R': camera.R, 't': camera.T},
-        ]
-
-    print("camera_intrinsics", camera_intrinsics)
-    print("camera_extrinsics", camera_extrinsics)
-
+    # images.bin / cameras.bin are read from the working directory
+    images_folder = "images"
+    cam_infos = load_colmap_cameras('.', images_folder)
 
     ply_file_path = os.path.join('./mesh_ply', args.input_file)
 
@@ -196,4 +42,5 @@ if __name__ == '__main__':
 
     binary_masks = process_masks(mask_folder_path)
 
-    filtered_pcd = project_and_filter(cam_infos, binary_masks, new_file_path)
\ No newline at end of file
+    filtered_pcd = project_and_filter(cam_infos, binary_masks, ply_file_path, new_file_path, text=args.ascii,
+                                      vote_ratio=args.vote_ratio)
@@ -3,39 +3,175 @@ import cv2
 import math
 import argparse
 import shutil
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncImageWriter:
+    """
+    Encode and write frames on a small thread pool so that decoding does not wait for the JPEG
+    encoder. At most max_pending frames are queued, write() blocks beyond that.
+    Frames larger than max_dimension on their longer side are downscaled before encoding.
+    """
+    def __init__(self, jpeg_quality=95, max_dimension=None, num_threads=2, max_pending=8):
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.max_dimension = max_dimension
+        self.executor = ThreadPoolExecutor(max_workers=num_threads)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.futures = []
+
+    def _write(self, image_path, frame):
+        try:
+            longer_side = max(frame.shape[:2])
+            if self.max_dimension and longer_side > self.max_dimension:
+                scale = self.max_dimension / longer_side
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            if not cv2.imwrite(image_path, frame, self.params):
+                raise IOError(f"Failed to write {image_path}")
+        finally:
+            self.slots.release()
+
+    def write(self, image_path, frame):
+        self.slots.acquire()
+        self.futures.append(self.executor.submit(self._write, image_path, frame))
+
+    def close(self):
+        # Wait for every pending frame and re-raise the first failure
+        self.executor.shutdown(wait=True)
+        for future in self.futures:
+            future.result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Let the pending writes finish but keep the original error instead of a write failure
+            self.executor.shutdown(wait=True)
 
 
-def extract_images(video_path, output_folder, target_frame_count=150):
-    video_name = os.path.splitext(os.path.basename(video_path))[0]
-    output_path = os.path.join(output_folder, video_name)
+def frame_sharpness(small_gray):
+    # Variance of the Laplacian, low for blurry frames
+    return float(cv2.Laplacian(small_gray, cv2.CV_32F).var())
 
-    if not os.path.exists(output_path):
-        os.makedirs(output_path)
 
-    cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+def frame_motion(prev_small_gray, small_gray):
+    # Mean optical-flow magnitude to the previous frame, in pixels of the frames passed in
+    flow = cv2.calcOpticalFlowFarneback(prev_small_gray, small_gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+    return float(np.mean(cv2.magnitude(flow[..., 0], flow[..., 1])))
 
-    if total_frames <= target_frame_count:
-        frame_interval = 1
-        target_frame_count = total_frames
-    else:
-        frame_interval = math.ceil(total_frames / target_frame_count)
 
+def extract_sharp_frames(cap, writer, output_path, video_name, frame_interval, target_frame_count,
+                         score_width=320, flow_weight=1.0):
+    """
+    Decode every frame once and, within each window of frame_interval frames, save the one with
+    the best sharpness / (1 + flow_weight * motion). Sharpness is measured on a score_width wide
+    grayscale copy and motion on half of that, which keeps scoring far cheaper than decoding.
+    :return: (number of extracted frames, time spent decoding).
+    """
+    decode_time = 0.0
     count = 0
     extracted_count = 0
+    prev_tiny = None
+    best_frame, best_score = None, -1.0
 
     while cap.isOpened() and extracted_count < target_frame_count:
+        decode_start = time.perf_counter()
         ret, frame = cap.read()
-        if ret:
-            if count % frame_interval == 0:
-                image_name = os.path.join(output_path, f"{video_name}_{extracted_count}.jpg")
-                cv2.imwrite(image_name, frame)
-                extracted_count += 1
-            count += 1
-        else:
+        decode_time += time.perf_counter() - decode_start
+        if not ret:
             break
 
-    cap.release()
+        scale = score_width / frame.shape[1]
+        small = cv2.cvtColor(cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY)
+        tiny = cv2.pyrDown(small)
+        motion = frame_motion(prev_tiny, tiny) if prev_tiny is not None else 0.0
+        prev_tiny = tiny
+        score = frame_sharpness(small) / (1.0 + flow_weight * motion)
+        if score > best_score:
+            best_frame, best_score = frame, score
+
+        count += 1
+        if count % frame_interval == 0:
+            writer.write(os.path.join(output_path, f"{video_name}_{extracted_count}.jpg"), best_frame)
+            extracted_count += 1
+            best_frame, best_score = None, -1.0
+
+    # The last window may be cut short by the end of the video
+    if best_frame is not None and extracted_count < target_frame_count:
+        writer.write(os.path.join(output_path, f"{video_name}_{extracted_count}.jpg"), best_frame)
+        extracted_count += 1
+    return extracted_count, decode_time
+
+
+def extract_images(video_path, output_folder, target_frame_count=150, mode='grab', score_width=320,
+                   flow_weight=1.0, jpeg_quality=95, max_dimension=None, write_threads=2):
+    """
+    Save one frame per window of frame_interval frames as a JPEG.
+    mode='read' decodes and converts every frame, 'grab' only grabs the skipped frames and
+    retrieves the kept ones, 'seek' jumps to each kept frame through the nearest keyframe.
+    All three keep the first frame of every window, 'sharp' keeps the least blurry one
+    (see extract_sharp_frames). Frames are written through an AsyncImageWriter.
+    :return: number of extracted frames.
+    """
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    output_path = os.path.join(output_folder, video_name)
+
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+
+    start_time = time.perf_counter()
+    decode_time = 0.0
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        with AsyncImageWriter(jpeg_quality, max_dimension, write_threads) as writer:
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+            if total_frames <= target_frame_count:
+                frame_interval = 1
+                target_frame_count = total_frames
+            else:
+                frame_interval = math.ceil(total_frames / target_frame_count)
+
+            count = 0
+            extracted_count = 0
+
+            if mode == 'sharp':
+                extracted_count, decode_time = extract_sharp_frames(cap, writer, output_path, video_name,
+                                                                    frame_interval, target_frame_count,
+                                                                    score_width, flow_weight)
+            else:
+                while cap.isOpened() and extracted_count < target_frame_count:
+                    decode_start = time.perf_counter()
+                    if mode == 'seek':
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, count)
+                        ret, frame = cap.read()
+                    elif mode == 'grab' and count % frame_interval != 0:
+                        ret, frame = cap.grab(), None
+                    else:
+                        ret, frame = cap.read()
+                    decode_time += time.perf_counter() - decode_start
+
+                    if ret:
+                        if count % frame_interval == 0:
+                            image_name = os.path.join(output_path, f"{video_name}_{extracted_count}.jpg")
+                            writer.write(image_name, frame)
+                            extracted_count += 1
+                        count += frame_interval if mode == 'seek' else 1
+                    else:
+                        break
+    finally:
+        cap.release()
+
+    total_time = time.perf_counter() - start_time
+    print(f"{video_name}: {extracted_count} frames ({mode}), decode {decode_time:.2f}s / total {total_time:.2f}s")
+    return extracted_count
 
 
 def copy_to_input_folder(output_folder):
@@ -58,10 +194,19 @@ if __name__ == '__main__':
     parser.add_argument('-i', '--video_path', type=str, default= './video/flower2.mp4', help="Path to the input video file.")
     parser.add_argument('-o', '--output_folder', type=str, default= './frame', help="Folder to save the extracted frames.")
     parser.add_argument('-t', '--target_frame_count', type=int, default=150, help="Target number of frames to extract.")
+    parser.add_argument('-m', '--mode', type=str, default='grab', choices=['read', 'grab', 'seek', 'sharp'],
+                        help="read: decode every frame, grab: skip frames without retrieving them, seek: jump between kept frames, "
+                             "sharp: keep the least blurry frame of every window.")
+    parser.add_argument('--score_width', type=int, default=320, help="Width of the grayscale copy used to score frames in sharp mode.")
+    parser.add_argument('--flow_weight', type=float, default=1.0, help="How strongly optical-flow motion lowers a frame's score in sharp mode.")
+    parser.add_argument('-q', '--jpeg_quality', type=int, default=95, help="JPEG quality of the saved frames.")
+    parser.add_argument('--max_dimension', type=int, default=None, help="Downscale frames whose longer side exceeds this.")
+    parser.add_argument('--write_threads', type=int, default=2, help="Number of threads encoding the JPEGs.")
 
     args = parser.parse_args()
 
-    extract_images(args.video_path, args.output_folder, args.target_frame_count)
+    extract_images(args.video_path, args.output_folder, args.target_frame_count, args.mode,
+                   args.score_width, args.flow_weight, args.jpeg_quality, args.max_dimension, args.write_threads)
 
     copy_to_input_folder(args.output_folder)
 
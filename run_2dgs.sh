@@ -9,66 +9,96 @@ tmux send-keys -t progress "watch -n 1 tail -n 10 progress.log" C-m
 
 
 
+mkdir -p rembg_process/seeds
 for work_dir in frame/*/; do
     dir_name=$(basename "$work_dir")
+    if [ ! -f "frame/$dir_name/${dir_name}_0.jpg" ]; then
+        echo "No first frame in frame/$dir_name, skipping its seed mask" >&2
+    elif ! python stage_manifest.py check -n "$dir_name" -s masks -i "frame/$dir_name" -p model=u2net -o "2dgs_gen/$dir_name/masks" > /dev/null; then
+        rm -f "rembg_process/seeds/${dir_name}_0.png"
+        echo "frame/$dir_name/${dir_name}_0.jpg"
+    fi
+done | python rembg_process.py --stream -o ./rembg_process/seeds -m u2net
+
+for work_dir in frame/*/; do
+    dir_name=$(basename "$work_dir")
+    frame_dir="frame/$dir_name"
     echo "Processing directory: $dir_name" | tee -a progress.log
 
-    echo "Copying and renaming $dir_name to 2d-gaussian-splatting/data/input" | tee -a progress.log
-    cp -r "$work_dir"/* 2d-gaussian-splatting/data/input
-    
-    cd 2d-gaussian-splatting
+    if [ ! -f "$frame_dir/${dir_name}_0.jpg" ]; then
+        echo "No frames in $frame_dir, skipping $dir_name" | tee -a progress.log
+        continue
+    fi
 
-    python convert.py -s data
+    new_gen_dir="2dgs_gen/$dir_name"
+    echo "Creating directory $new_gen_dir" | tee -a progress.log
+    mkdir -p "$new_gen_dir"
 
-    python train.py -s data
+    if python stage_manifest.py check -n "$dir_name" -s colmap -i "$frame_dir" -o "$new_gen_dir/data"; then
+        echo "COLMAP of $dir_name is up to date" | tee -a progress.log
+    else
+        echo "Copying and renaming $dir_name to 2d-gaussian-splatting/data/input" | tee -a progress.log
+        cp -r "$work_dir"/* 2d-gaussian-splatting/data/input
 
-    output_dir=$(ls output | head -n 1)
+        cd 2d-gaussian-splatting
 
+        python convert.py -s data
 
-    echo "Running Python script 'render.py' with output directory: $output_dir" | tee -a progress.log
-    python render.py -m "output/$output_dir" -s data
-    
-    cd ..
+        cd ..
 
-    new_gen_dir="2dgs_gen/$dir_name"
-    echo "Creating directory $new_gen_dir" | tee -a progress.log
-    mkdir -p "$new_gen_dir"
+        echo "Copying data to $new_gen_dir/data" | tee -a progress.log
+        rm -rf "$new_gen_dir/data"
+        cp -r 2d-gaussian-splatting/data "$new_gen_dir/data"
+        rm -rf 2d-gaussian-splatting/data/*
+
+        python stage_manifest.py record -n "$dir_name" -s colmap -i "$frame_dir" -o "$new_gen_dir/data"
+    fi
+
+    if python stage_manifest.py check -n "$dir_name" -s 2dgs -i "$new_gen_dir/data" -o "$new_gen_dir/output"; then
+        echo "2DGS of $dir_name is up to date" | tee -a progress.log
+    else
+        cp -r "$new_gen_dir/data"/* 2d-gaussian-splatting/data
+
+        cd 2d-gaussian-splatting
+
+        python train.py -s data
+
+        output_dir=$(ls output | head -n 1)
+
+
+        echo "Running Python script 'render.py' with output directory: $output_dir" | tee -a progress.log
+        python render.py -m "output/$output_dir" -s data
+
+        cd ..
+
+        echo "Copying and renaming the output directory to $new_gen_dir/output" | tee -a progress.log
+        rm -rf "$new_gen_dir/output"
+        cp -r "2d-gaussian-splatting/output/$output_dir" "$new_gen_dir/output"
+
+        echo "Cleaning up data and output folders in 2d-gaussian-splatting..." | tee -a progress.log
+        rm -rf 2d-gaussian-splatting/data/*
+        rm -rf 2d-gaussian-splatting/output/*
+
+        python stage_manifest.py record -n "$dir_name" -s 2dgs -i "$new_gen_dir/data" -o "$new_gen_dir/output"
+    fi
+
+    if python stage_manifest.py check -n "$dir_name" -s masks -i "$frame_dir" -p model=u2net -o "$new_gen_dir/masks"; then
+        echo "Masks of $dir_name are up to date" | tee -a progress.log
+        continue
+    fi
+
+    if [ ! -f "rembg_process/seeds/${dir_name}_0.png" ]; then
+        echo "No seed mask for $dir_name, skipping its masks" | tee -a progress.log
+        continue
+    fi
+
+    workspace=$(python xmem_workspace.py prepare -n "$dir_name" -f "$frame_dir" -s "rembg_process/seeds/${dir_name}_0.png")
+
+    python ./xmem/eval.py --model ./xmem/saves/XMem-s012.pth --generic_path "$workspace" --dataset G --output "$workspace/out"
+
+    python xmem_workspace.py collect -n "$dir_name" -d "$new_gen_dir/masks"
 
-    echo "Copying data to $new_gen_dir/data" | tee -a progress.log
-    cp -r 2d-gaussian-splatting/data "$new_gen_dir/data"
-
-    echo "Copying and renaming the output directory to $new_gen_dir/output" | tee -a progress.log
-    cp -r "2d-gaussian-splatting/output/$output_dir" "$new_gen_dir/output"
-
-    echo "Cleaning up data and output folders in 2d-gaussian-splatting..." | tee -a progress.log
-    rm -rf 2d-gaussian-splatting/data/*
-    rm -rf 2d-gaussian-splatting/output/*
-    
-    cp "frame/$dir_name/${dir_name}_0.jpg" rembg_process/in
-    
-    rm -rf rembg_process/in/*
-    rm -rf rembg_process/out/*
-    rm -rf pic/JPEGImages/video1/*
-    rm -rf pic/Annotations/video1/*
-    rm -rf pic/video1
-    
-    rm -rf masks/*
-    
-    
-    python rembg_process.py -i "$dir_name" -o ./rembg_process/out -m u2net
-
-    python ./xmem/eval.py --model ./xmem/saves/XMem-s012.pth --generic_path ./pic --dataset G --output ./pic
-    
-    cp -r pic/video1/* masks
-    cp -r pic/video1/ "$new_gen_dir/masks"
-    
-    rm -rf rembg_process/in/*
-    rm -rf rembg_process/out/*
-    rm -rf pic/JPEGImages/video1/*
-    rm -rf pic/Annotations/video1/*
-    rm -rf pic/video1
-    
-    rm -rf masks/*
+    python stage_manifest.py record -n "$dir_name" -s masks -i "$frame_dir" -p model=u2net -o "$new_gen_dir/masks"
 done
 
 
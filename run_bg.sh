@@ -9,19 +9,6 @@ tmux send-keys -t progress "watch -n 1 tail -n 10 progress.log" C-m
 
 
 
-for work_dir in 2dgs_gen/*/; do
-    dir_name=$(basename "$work_dir")
-    echo "Processing directory: $dir_name" | tee -a progress.log
-
-
-    python file.py copy -n ${dir_name}
-    
-    python dilate.py -s 50
-    
-    python run.py -i ${dir_name}.ply
-    
-    python file.py delete
-    
-done
-
-
+# Dilation and mesh carving run per object in their own folders, in parallel (-j sets the worker count)
+# Extra arguments are passed on, e.g. ./run_bg.sh --vote_ratio 0.8 to carve by camera vote
+python auto_bg_process.py -s 50 -j "$(nproc)" "$@"
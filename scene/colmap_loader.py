@@ -21,6 +21,8 @@ BaseImage = collections.namedtuple(
     "Image", ["id", "qvec", "tvec", "camera_id", "name", "xys", "point3D_ids"])
 Point3D = collections.namedtuple(
     "Point3D", ["id", "xyz", "rgb", "error", "image_ids", "point2D_idxs"])
+Tracks = collections.namedtuple(
+    "Tracks", ["point3D_ids", "indptr", "image_ids", "point2D_idxs"])
 CAMERA_MODELS = {
     CameraModel(model_id=0, model_name="SIMPLE_PINHOLE", num_params=3),
     CameraModel(model_id=1, model_name="PINHOLE", num_params=4),
@@ -65,6 +67,50 @@ def rotmat2qvec(R):
         qvec *= -1
     return qvec
 
+def qvec2rotmat_batch(qvecs):
+    """
+    (N, 4) quaternions to (N, 3, 3) rotation matrices, same formula as qvec2rotmat.
+    """
+    qvecs = np.asarray(qvecs, dtype=np.float64).reshape(-1, 4)
+    w, x, y, z = qvecs.T
+    R = np.empty((len(qvecs), 3, 3))
+    R[:, 0, 0] = 1 - 2 * y**2 - 2 * z**2
+    R[:, 0, 1] = 2 * x * y - 2 * w * z
+    R[:, 0, 2] = 2 * z * x + 2 * w * y
+    R[:, 1, 0] = 2 * x * y + 2 * w * z
+    R[:, 1, 1] = 1 - 2 * x**2 - 2 * z**2
+    R[:, 1, 2] = 2 * y * z - 2 * w * x
+    R[:, 2, 0] = 2 * z * x - 2 * w * y
+    R[:, 2, 1] = 2 * y * z + 2 * w * x
+    R[:, 2, 2] = 1 - 2 * x**2 - 2 * y**2
+    return R
+
+def rotmat2qvec_batch(R):
+    """
+    (N, 3, 3) rotation matrices to (N, 4) quaternions with w >= 0, one stacked eigh for all
+    matrices instead of one per call to rotmat2qvec.
+    """
+    R = np.asarray(R, dtype=np.float64).reshape(-1, 3, 3)
+    Rxx, Ryx, Rzx = R[:, 0, 0], R[:, 0, 1], R[:, 0, 2]
+    Rxy, Ryy, Rzy = R[:, 1, 0], R[:, 1, 1], R[:, 1, 2]
+    Rxz, Ryz, Rzz = R[:, 2, 0], R[:, 2, 1], R[:, 2, 2]
+    K = np.zeros((len(R), 4, 4))
+    K[:, 0, 0] = Rxx - Ryy - Rzz
+    K[:, 1, 0] = Ryx + Rxy
+    K[:, 1, 1] = Ryy - Rxx - Rzz
+    K[:, 2, 0] = Rzx + Rxz
+    K[:, 2, 1] = Rzy + Ryz
+    K[:, 2, 2] = Rzz - Rxx - Ryy
+    K[:, 3, 0] = Ryz - Rzy
+    K[:, 3, 1] = Rzx - Rxz
+    K[:, 3, 2] = Rxy - Ryx
+    K[:, 3, 3] = Rxx + Ryy + Rzz
+    K /= 3.0
+    eigvals, eigvecs = np.linalg.eigh(K)
+    qvecs = eigvecs[np.arange(len(R)), :, np.argmax(eigvals, axis=1)][:, [3, 0, 1, 2]]
+    qvecs[qvecs[:, 0] < 0] *= -1
+    return qvecs
+
 class Image(BaseImage):
     def qvec2rotmat(self):
         return qvec2rotmat(self.qvec)
@@ -85,73 +131,72 @@ def read_points3D_text(path):
     see: src/base/reconstruction.cc
         void Reconstruction::ReadPoints3DText(const std::string& path)
         void Reconstruction::WritePoints3DText(const std::string& path)
+
+    Single pass: the id, xyz, rgb and error fields of all points are joined and parsed at once.
     """
-    xyzs = None
-    rgbs = None
-    errors = None
-    num_points = 0
+    fields = []
     with open(path, "r") as fid:
-        while True:
-            line = fid.readline()
-            if not line:
-                break
+        for line in fid:
             line = line.strip()
             if len(line) > 0 and line[0] != "#":
-                num_points += 1
+                fields.extend(line.split(None, 8)[:8])
+    values = np.fromstring(" ".join(fields), sep=" ").reshape(-1, 8)
+    xyzs = values[:, 1:4].copy()
+    rgbs = values[:, 4:7].copy()
+    errors = values[:, 7:8].copy()
+    return xyzs, rgbs, errors
 
+def _gather_byte_ranges(data, starts, lengths):
+    # Mark the non-overlapping byte ranges [start, start + length) and copy them out in file order
+    delta = np.zeros(len(data) + 1, dtype=np.int8)
+    delta[starts] += 1
+    delta[starts + lengths] -= 1
+    return data[np.cumsum(delta[:-1], dtype=np.int8).astype(bool)]
 
-    xyzs = np.empty((num_points, 3))
-    rgbs = np.empty((num_points, 3))
-    errors = np.empty((num_points, 1))
-    count = 0
-    with open(path, "r") as fid:
-        while True:
-            line = fid.readline()
-            if not line:
-                break
-            line = line.strip()
-            if len(line) > 0 and line[0] != "#":
-                elems = line.split()
-                xyz = np.array(tuple(map(float, elems[1:4])))
-                rgb = np.array(tuple(map(int, elems[4:7])))
-                error = np.array(float(elems[7]))
-                xyzs[count] = xyz
-                rgbs[count] = rgb
-                errors[count] = error
-                count += 1
-
-    return xyzs, rgbs, errors
+POINT3D_DTYPE = np.dtype([("id", "<u8"), ("xyz", "<f8", 3), ("rgb", "u1", 3), ("error", "<f8")])
+# Fixed part of a point record followed by its track length
+POINT3D_RECORD_BYTES = POINT3D_DTYPE.itemsize + 8
 
-def read_points3D_binary(path_to_model_file):
+def read_points3D_binary(path_to_model_file, return_tracks=False):
     """
     see: src/base/reconstruction.cc
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
-    """
 
+    The file is read into one buffer. Only the track lengths are walked to find where every
+    point starts, the fixed fields and the tracks are then gathered with array indexing.
+    :param return_tracks: also return a Tracks tuple, the tracks of point i being
+        image_ids[indptr[i]:indptr[i + 1]] and point2D_idxs[indptr[i]:indptr[i + 1]].
+    """
+    data = np.fromfile(path_to_model_file, dtype=np.uint8)
+    num_points = int(data[:8].view("<u8")[0])
 
-    with open(path_to_model_file, "rb") as fid:
-        num_points = read_next_bytes(fid, 8, "Q")[0]
+    # Each record is 43 bytes of fixed fields, the track length and 8 bytes per track element
+    unpack_track_length = struct.Struct("<Q").unpack_from
+    offsets = [0] * num_points
+    track_lengths = [0] * num_points
+    offset = 8
+    for p_id in range(num_points):
+        offsets[p_id] = offset
+        track_length = unpack_track_length(data, offset + POINT3D_DTYPE.itemsize)[0]
+        track_lengths[p_id] = track_length
+        offset += POINT3D_RECORD_BYTES + 8 * track_length
+    offsets = np.array(offsets, dtype=np.int64)
+    track_lengths = np.array(track_lengths, dtype=np.int64)
 
-        xyzs = np.empty((num_points, 3))
-        rgbs = np.empty((num_points, 3))
-        errors = np.empty((num_points, 1))
+    records = _gather_byte_ranges(data, offsets, POINT3D_DTYPE.itemsize).view(POINT3D_DTYPE)
+    xyzs = records["xyz"].astype(np.float64)
+    rgbs = records["rgb"].astype(np.float64)
+    errors = records["error"].astype(np.float64)[:, None]
+    if not return_tracks:
+        return xyzs, rgbs, errors
 
-        for p_id in range(num_points):
-            binary_point_line_properties = read_next_bytes(
-                fid, num_bytes=43, format_char_sequence="QdddBBBd")
-            xyz = np.array(binary_point_line_properties[1:4])
-            rgb = np.array(binary_point_line_properties[4:7])
-            error = np.array(binary_point_line_properties[7])
-            track_length = read_next_bytes(
-                fid, num_bytes=8, format_char_sequence="Q")[0]
-            track_elems = read_next_bytes(
-                fid, num_bytes=8*track_length,
-                format_char_sequence="ii"*track_length)
-            xyzs[p_id] = xyz
-            rgbs[p_id] = rgb
-            errors[p_id] = error
-    return xyzs, rgbs, errors
+    indptr = np.zeros(num_points + 1, dtype=np.int64)
+    np.cumsum(track_lengths, out=indptr[1:])
+    elements = _gather_byte_ranges(data, offsets + POINT3D_RECORD_BYTES, 8 * track_lengths).view("<i4").reshape(-1, 2)
+    tracks = Tracks(point3D_ids=records["id"].astype(np.int64), indptr=indptr,
+                    image_ids=elements[:, 0].copy(), point2D_idxs=elements[:, 1].copy())
+    return xyzs, rgbs, errors, tracks
 
 def read_intrinsics_text(path):
     """
@@ -177,34 +222,51 @@ def read_intrinsics_text(path):
                                             params=params)
     return cameras
 
-def read_extrinsics_binary(path_to_model_file):
+IMAGE_DTYPE = np.dtype([("id", "<i4"), ("qvec", "<f8", 4), ("tvec", "<f8", 3), ("camera_id", "<i4")])
+POINT2D_DTYPE = np.dtype([("xy", "<f8", 2), ("point3D_id", "<i8")])
+
+def read_null_terminated_string(fid, chunk_size=64):
+    start = fid.tell()
+    string = b""
+    while True:
+        chunk = fid.read(chunk_size)
+        if not chunk:
+            raise EOFError("Unterminated string in COLMAP binary file")
+        end = chunk.find(b"\x00")
+        if end >= 0:
+            string += chunk[:end]
+            fid.seek(start + len(string) + 1)
+            return string.decode("utf-8")
+        string += chunk
+
+def read_extrinsics_binary(path_to_model_file, poses_only=False):
     """
     see: src/base/reconstruction.cc
         void Reconstruction::ReadImagesBinary(const std::string& path)
         void Reconstruction::WriteImagesBinary(const std::string& path)
+
+    The keypoint block of every image is read as one structured array, xys and point3D_ids are
+    views into it. With poses_only the keypoint blocks are skipped and xys/point3D_ids are None.
     """
     images = {}
     with open(path_to_model_file, "rb") as fid:
         num_reg_images = read_next_bytes(fid, 8, "Q")[0]
         for _ in range(num_reg_images):
-            binary_image_properties = read_next_bytes(
-                fid, num_bytes=64, format_char_sequence="idddddddi")
-            image_id = binary_image_properties[0]
-            qvec = np.array(binary_image_properties[1:5])
-            tvec = np.array(binary_image_properties[5:8])
-            camera_id = binary_image_properties[8]
-            image_name = ""
-            current_char = read_next_bytes(fid, 1, "c")[0]
-            while current_char != b"\x00":   # look for the ASCII 0 entry
-                image_name += current_char.decode("utf-8")
-                current_char = read_next_bytes(fid, 1, "c")[0]
+            binary_image_properties = np.frombuffer(fid.read(IMAGE_DTYPE.itemsize), dtype=IMAGE_DTYPE)[0]
+            image_id = int(binary_image_properties["id"])
+            qvec = binary_image_properties["qvec"].copy()
+            tvec = binary_image_properties["tvec"].copy()
+            camera_id = int(binary_image_properties["camera_id"])
+            image_name = read_null_terminated_string(fid)
             num_points2D = read_next_bytes(fid, num_bytes=8,
                                            format_char_sequence="Q")[0]
-            x_y_id_s = read_next_bytes(fid, num_bytes=24*num_points2D,
-                                       format_char_sequence="ddq"*num_points2D)
-            xys = np.column_stack([tuple(map(float, x_y_id_s[0::3])),
-                                   tuple(map(float, x_y_id_s[1::3]))])
-            point3D_ids = np.array(tuple(map(int, x_y_id_s[2::3])))
+            if poses_only:
+                fid.seek(POINT2D_DTYPE.itemsize * num_points2D, 1)
+                xys = point3D_ids = None
+            else:
+                points2D = np.frombuffer(fid.read(POINT2D_DTYPE.itemsize * num_points2D), dtype=POINT2D_DTYPE)
+                xys = points2D["xy"]
+                point3D_ids = points2D["point3D_id"]
             images[image_id] = Image(
                 id=image_id, qvec=qvec, tvec=tvec,
                 camera_id=camera_id, name=image_name,
@@ -241,9 +303,12 @@ def read_intrinsics_binary(path_to_model_file):
     return cameras
 
 
-def read_extrinsics_text(path):
+def read_extrinsics_text(path, poses_only=False):
     """
     Taken from https://github.com/colmap/colmap/blob/dev/scripts/python/read_write_model.py
+
+    Every keypoint line is parsed in one call. With poses_only it is skipped unparsed and
+    xys/point3D_ids are None, as in read_extrinsics_binary.
     """
     images = {}
     with open(path, "r") as fid:
@@ -259,10 +324,13 @@ def read_extrinsics_text(path):
                 tvec = np.array(tuple(map(float, elems[5:8])))
                 camera_id = int(elems[8])
                 image_name = elems[9]
-                elems = fid.readline().split()
-                xys = np.column_stack([tuple(map(float, elems[0::3])),
-                                       tuple(map(float, elems[1::3]))])
-                point3D_ids = np.array(tuple(map(int, elems[2::3])))
+                keypoint_line = fid.readline()
+                if poses_only:
+                    xys = point3D_ids = None
+                else:
+                    x_y_id_s = np.fromstring(keypoint_line.strip(), sep=" ").reshape(-1, 3)
+                    xys = x_y_id_s[:, :2].copy()
+                    point3D_ids = x_y_id_s[:, 2].astype(np.int64)
                 images[image_id] = Image(
                     id=image_id, qvec=qvec, tvec=tvec,
                     camera_id=camera_id, name=image_name,
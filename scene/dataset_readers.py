@@ -13,9 +13,9 @@ import os
 import sys
 from PIL import Image
 from typing import NamedTuple
-from scene.colmap_loader import read_extrinsics_text, read_intrinsics_text, qvec2rotmat, \
-    read_extrinsics_binary, read_intrinsics_binary, read_points3D_binary, read_points3D_text
-from utils.graphics_utils import getWorld2View2, focal2fov, fov2focal
+from scene.colmap_loader import qvec2rotmat_batch
+from scene.geometry_cache import load_scene_geometry
+from utils.graphics_utils import getCameraCenters, focal2fov, fov2focal
 import numpy as np
 import json
 from pathlib import Path
@@ -37,6 +37,23 @@ class CameraInfo(NamedTuple):
     width: int
     height: int
 
+class LazyImage:
+    """
+    Handle to a frame on disk that is only opened the first time it is used, so that
+    building CameraInfo does no image I/O. Attribute access is forwarded to the PIL image.
+    """
+    def __init__(self, image_path):
+        self.image_path = image_path
+        self._image = None
+
+    def load(self):
+        if self._image is None:
+            self._image = Image.open(self.image_path)
+        return self._image
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
 class SceneInfo(NamedTuple):
     point_cloud: BasicPointCloud
     train_cameras: list
@@ -53,22 +70,23 @@ def getNerfppNorm(cam_info):
         diagonal = np.max(dist)
         return center.flatten(), diagonal
 
-    cam_centers = []
-
-    for cam in cam_info:
-        W2C = getWorld2View2(cam.R, cam.T)
-        C2W = np.linalg.inv(W2C)
-        cam_centers.append(C2W[:3, 3:4])
+    cam_centers = getCameraCenters(np.array([cam.R for cam in cam_info]), np.array([cam.T for cam in cam_info]))
 
-    center, diagonal = get_center_and_diag(cam_centers)
+    center, diagonal = get_center_and_diag(list(cam_centers[:, :, None]))
     radius = diagonal * 1.1
 
     translate = -center
 
     return {"translate": translate, "radius": radius}
 
-def readColmapCameras(cam_extrinsics, cam_intrinsics, images_folder):
+def readColmapCameras(cam_extrinsics, cam_intrinsics, images_folder, load_images=True):
+    """
+    With load_images=False only the camera geometry is read and CameraInfo.image is None,
+    otherwise it is a LazyImage that opens the frame on first use.
+    """
     cam_infos = []
+    # All rotations in one call, R is stored transposed as in the per-camera version
+    rotations = np.transpose(qvec2rotmat_batch([extr.qvec for extr in cam_extrinsics.values()]), (0, 2, 1))
     for idx, key in enumerate(cam_extrinsics):
         sys.stdout.write('\r')
         # the exact output you're looking for:
@@ -81,11 +99,12 @@ def readColmapCameras(cam_extrinsics, cam_intrinsics, images_folder):
         width = intr.width
 
         uid = intr.id
-        R = np.transpose(qvec2rotmat(extr.qvec))
+        R = rotations[idx]
         T = np.array(extr.tvec)
 
         if intr.model=="SIMPLE_PINHOLE":
             focal_length_x = intr.params[0]
+            focal_length_y = focal_length_x
             FovY = focal2fov(focal_length_x, height)
             FovX = focal2fov(focal_length_x, width)
         elif intr.model=="PINHOLE":
@@ -98,7 +117,7 @@ def readColmapCameras(cam_extrinsics, cam_intrinsics, images_folder):
 
         image_path = os.path.join(images_folder, os.path.basename(extr.name))
         image_name = os.path.basename(image_path).split(".")[0]
-        image = Image.open(image_path)
+        image = LazyImage(image_path) if load_images else None
 
         cam_info = CameraInfo(uid=uid, R=R, T=T, FocalX=focal_length_x, FocalY=focal_length_y, FovY=FovY, FovX=FovX, image=image,
                               image_path=image_path, image_name=image_name, width=width, height=height)
@@ -106,6 +125,31 @@ def readColmapCameras(cam_extrinsics, cam_intrinsics, images_folder):
     sys.stdout.write('\n')
     return cam_infos
 
+def readColmapCamerasFromGeometry(geometry, images_folder, load_images=True):
+    """
+    Same CameraInfo list as readColmapCameras, built from the stacked arrays of a SceneGeometry.
+    """
+    cam_infos = []
+    for idx in range(len(geometry.names)):
+        model = str(geometry.models[idx])
+        assert model in ("SIMPLE_PINHOLE", "PINHOLE"), "Colmap camera model not handled: only undistorted datasets (PINHOLE or SIMPLE_PINHOLE cameras) supported!"
+        height = int(geometry.heights[idx])
+        width = int(geometry.widths[idx])
+        focal_length_x = float(geometry.K[idx, 0, 0])
+        focal_length_y = float(geometry.K[idx, 1, 1])
+        FovY = focal2fov(focal_length_y, height)
+        FovX = focal2fov(focal_length_x, width)
+
+        image_path = os.path.join(images_folder, os.path.basename(str(geometry.names[idx])))
+        image_name = os.path.basename(image_path).split(".")[0]
+        image = LazyImage(image_path) if load_images else None
+
+        cam_info = CameraInfo(uid=int(geometry.camera_ids[idx]), R=np.array(geometry.R[idx]), T=np.array(geometry.T[idx]),
+                              FocalX=focal_length_x, FocalY=focal_length_y, FovY=FovY, FovX=FovX, image=image,
+                              image_path=image_path, image_name=image_name, width=width, height=height)
+        cam_infos.append(cam_info)
+    return cam_infos
+
 def fetchPly(path):
     plydata = PlyData.read(path)
     vertices = plydata['vertex']
@@ -124,7 +168,8 @@ def storePly(path, xyz, rgb):
 
     elements = np.empty(xyz.shape[0], dtype=dtype)
     attributes = np.concatenate((xyz, normals, rgb), axis=1)
-    elements[:] = list(map(tuple, attributes))
+    for idx, (name, _) in enumerate(dtype):
+        elements[name] = attributes[:, idx]
 
     # Create the PlyData object and write to file
     vertex_element = PlyElement.describe(elements, 'vertex')
@@ -132,19 +177,11 @@ def storePly(path, xyz, rgb):
     ply_data.write(path)
 
 def readColmapSceneInfo(path, images, eval, llffhold=8):
-    try:
-        cameras_extrinsic_file = os.path.join(path, "sparse/0", "images.bin")
-        cameras_intrinsic_file = os.path.join(path, "sparse/0", "cameras.bin")
-        cam_extrinsics = read_extrinsics_binary(cameras_extrinsic_file)
-        cam_intrinsics = read_intrinsics_binary(cameras_intrinsic_file)
-    except:
-        cameras_extrinsic_file = os.path.join(path, "sparse/0", "images.txt")
-        cameras_intrinsic_file = os.path.join(path, "sparse/0", "cameras.txt")
-        cam_extrinsics = read_extrinsics_text(cameras_extrinsic_file)
-        cam_intrinsics = read_intrinsics_text(cameras_intrinsic_file)
+    # Cameras and points come from the cached stacked arrays, rebuilt when sparse/0 changes
+    geometry = load_scene_geometry(os.path.join(path, "sparse/0"))
 
     reading_dir = "images" if images == None else images
-    cam_infos_unsorted = readColmapCameras(cam_extrinsics=cam_extrinsics, cam_intrinsics=cam_intrinsics, images_folder=os.path.join(path, reading_dir))
+    cam_infos_unsorted = readColmapCamerasFromGeometry(geometry, images_folder=os.path.join(path, reading_dir))
     cam_infos = sorted(cam_infos_unsorted.copy(), key = lambda x : x.image_name)
 
     if eval:
@@ -157,15 +194,9 @@ def readColmapSceneInfo(path, images, eval, llffhold=8):
     nerf_normalization = getNerfppNorm(train_cam_infos)
 
     ply_path = os.path.join(path, "sparse/0/points3D.ply")
-    bin_path = os.path.join(path, "sparse/0/points3D.bin")
-    txt_path = os.path.join(path, "sparse/0/points3D.txt")
-    if not os.path.exists(ply_path):
+    if not os.path.exists(ply_path) and len(geometry.xyz) > 0:
         print("Converting point3d.bin to .ply, will happen only the first time you open the scene.")
-        try:
-            xyz, rgb, _ = read_points3D_binary(bin_path)
-        except:
-            xyz, rgb, _ = read_points3D_text(txt_path)
-        storePly(ply_path, xyz, rgb)
+        storePly(ply_path, geometry.xyz, geometry.rgb)
     try:
         pcd = fetchPly(ply_path)
     except:
@@ -209,13 +240,14 @@ def readCamerasFromTransforms(path, transformsfile, white_background, extension=
 
             norm_data = im_data / 255.0
             arr = norm_data[:,:,:3] * norm_data[:, :, 3:4] + bg * (1 - norm_data[:, :, 3:4])
-            image = Image.fromarray(np.array(arr*255.0, dtype=np.byte), "RGB")
+            image = Image.fromarray(np.array(arr*255.0, dtype=np.uint8), "RGB")
 
-            fovy = focal2fov(fov2focal(fovx, image.size[0]), image.size[1])
+            focal = fov2focal(fovx, image.size[0])
+            fovy = focal2fov(focal, image.size[1])
             FovY = fovy 
             FovX = fovx
 
-            cam_infos.append(CameraInfo(uid=idx, R=R, T=T, FovY=FovY, FovX=FovX, image=image,
+            cam_infos.append(CameraInfo(uid=idx, R=R, T=T, FocalX=focal, FocalY=focal, FovY=FovY, FovX=FovX, image=image,
                             image_path=image_path, image_name=image_name, width=image.size[0], height=image.size[1]))
             
     return cam_infos
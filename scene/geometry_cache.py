@@ -0,0 +1,139 @@
+import os
+import struct
+import zipfile
+import collections
+import numpy as np
+from scene.colmap_loader import read_extrinsics_binary, read_intrinsics_binary, read_extrinsics_text, \
+    read_intrinsics_text, read_points3D_binary, read_points3D_text, qvec2rotmat_batch
+
+# Bump when the stored arrays change, older caches are then rebuilt
+GEOMETRY_CACHE_VERSION = 1
+# Hidden so that the stage manifest does not count it as part of the model it sits in
+GEOMETRY_CACHE_NAME = ".scene_geometry.npz"
+
+SceneGeometry = collections.namedtuple(
+    "SceneGeometry", ["image_ids", "camera_ids", "names", "models", "R", "T", "K", "widths", "heights", "xyz", "rgb"])
+SINGLE_FOCAL_MODELS = {"SIMPLE_PINHOLE", "SIMPLE_RADIAL", "RADIAL", "SIMPLE_RADIAL_FISHEYE", "RADIAL_FISHEYE"}
+
+
+def find_model_files(sparse_path):
+    """
+    cameras, images and (if present) points3D of the COLMAP model in sparse_path, binary preferred over text.
+    """
+    for ext in (".bin", ".txt"):
+        files = [os.path.join(sparse_path, "cameras" + ext), os.path.join(sparse_path, "images" + ext)]
+        if all(os.path.isfile(path) for path in files):
+            points_path = os.path.join(sparse_path, "points3D" + ext)
+            if os.path.isfile(points_path):
+                files.append(points_path)
+            return files
+    raise FileNotFoundError(f"No COLMAP model found in {sparse_path}")
+
+
+def source_stats(files):
+    stats = [os.stat(path) for path in files]
+    return np.array([[stat.st_mtime_ns, stat.st_size] for stat in stats], dtype=np.int64).reshape(-1, 2)
+
+
+def build_scene_geometry(files):
+    """
+    Stack the cameras of a COLMAP model in file order. R and T follow CameraInfo: R is the transposed
+    world-to-camera rotation, T the world-to-camera translation.
+    """
+    binary = files[0].endswith(".bin")
+    if binary:
+        cam_intrinsics = read_intrinsics_binary(files[0])
+        cam_extrinsics = read_extrinsics_binary(files[1], poses_only=True)
+    else:
+        cam_intrinsics = read_intrinsics_text(files[0])
+        cam_extrinsics = read_extrinsics_text(files[1], poses_only=True)
+    if len(files) > 2:
+        xyz, rgb, _ = read_points3D_binary(files[2]) if binary else read_points3D_text(files[2])
+    else:
+        xyz, rgb = np.zeros((0, 3)), np.zeros((0, 3))
+
+    extrs = list(cam_extrinsics.values())
+    intrs = [cam_intrinsics[extr.camera_id] for extr in extrs]
+    K = np.zeros((len(intrs), 3, 3))
+    K[:, 2, 2] = 1
+    for idx, intr in enumerate(intrs):
+        if intr.model in SINGLE_FOCAL_MODELS:
+            K[idx, 0, 0] = K[idx, 1, 1] = intr.params[0]
+            K[idx, :2, 2] = intr.params[1:3]
+        else:
+            K[idx, 0, 0], K[idx, 1, 1], K[idx, 0, 2], K[idx, 1, 2] = intr.params[:4]
+
+    return SceneGeometry(
+        image_ids=np.array([extr.id for extr in extrs], dtype=np.int32),
+        camera_ids=np.array([extr.camera_id for extr in extrs], dtype=np.int32),
+        names=np.array([extr.name for extr in extrs], dtype=str),
+        models=np.array([intr.model for intr in intrs], dtype=str),
+        R=np.transpose(qvec2rotmat_batch([extr.qvec for extr in extrs]), (0, 2, 1)),
+        T=np.array([extr.tvec for extr in extrs], dtype=np.float64).reshape(-1, 3),
+        K=K,
+        widths=np.array([intr.width for intr in intrs], dtype=np.int64),
+        heights=np.array([intr.height for intr in intrs], dtype=np.int64),
+        xyz=np.asarray(xyz, dtype=np.float64),
+        rgb=np.asarray(rgb).astype(np.uint8))
+
+
+def load_npz(path, mmap=True):
+    """
+    np.load for .npz archives that memory-maps the stored (uncompressed) members instead of
+    reading them, which np.load ignores mmap_mode for.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as fid:
+        for info in archive.infolist():
+            key = info.filename[:-len(".npy")] if info.filename.endswith(".npy") else info.filename
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                # The member data starts after its local header, whose extra field can differ from the central one
+                fid.seek(info.header_offset + 26)
+                name_length, extra_length = struct.unpack("<HH", fid.read(4))
+                fid.seek(info.header_offset + 30 + name_length + extra_length)
+                version = np.lib.format.read_magic(fid)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fid)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fid)
+                if not dtype.hasobject and len(shape) > 0 and np.prod(shape) > 0:
+                    arrays[key] = np.memmap(path, dtype=dtype, mode="r", offset=fid.tell(), shape=shape,
+                                            order="F" if fortran_order else "C")
+                    continue
+            with archive.open(info) as member:
+                arrays[key] = np.lib.format.read_array(member)
+    return arrays
+
+
+def save_scene_geometry(path, geometry, sources, stats):
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, version=GEOMETRY_CACHE_VERSION, sources=sources, source_stats=stats, **geometry._asdict())
+    os.replace(path + ".tmp", path)
+
+
+def load_scene_geometry(sparse_path, use_cache=True):
+    """
+    SceneGeometry of the COLMAP model in sparse_path. The arrays are kept in <sparse_path>/.scene_geometry.npz,
+    memory-mapped on later calls and rebuilt when the version or the mtime/size of any model file changes.
+    """
+    files = find_model_files(sparse_path)
+    sources = np.array([os.path.basename(path) for path in files], dtype=str)
+    stats = source_stats(files)
+    cache_path = os.path.join(sparse_path, GEOMETRY_CACHE_NAME)
+
+    if use_cache and os.path.isfile(cache_path):
+        try:
+            cached = load_npz(cache_path)
+            if int(cached["version"]) == GEOMETRY_CACHE_VERSION and np.array_equal(cached["sources"], sources) \
+                    and np.array_equal(cached["source_stats"], stats):
+                return SceneGeometry(**{field: cached[field] for field in SceneGeometry._fields})
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            print(f"Ignoring unreadable scene geometry cache {cache_path}: {e}")
+
+    geometry = build_scene_geometry(files)
+    if use_cache:
+        try:
+            save_scene_geometry(cache_path, geometry, sources, stats)
+        except OSError as e:
+            print(f"Could not write the scene geometry cache {cache_path}: {e}")
+    return geometry
@@ -11,84 +11,112 @@ tmux send-keys -t progress "watch -n 1 tail -n 10 progress.log" C-m
 
 
 
+# 一次性为所有需要重新生成mask的物体分割第一帧，rembg模型只加载一次
+mkdir -p rembg_process/seeds
+for work_dir in frame/*/; do
+    dir_name=$(basename "$work_dir")
+    # 视频处理失败时frame/<name>/可能是空的，没有第一帧就不交给rembg
+    if [ ! -f "frame/$dir_name/${dir_name}_0.jpg" ]; then
+        echo "No first frame in frame/$dir_name, skipping its seed mask" >&2
+    elif ! python stage_manifest.py check -n "$dir_name" -s masks -i "frame/$dir_name" -p model=u2net -o "2dgs_gen/$dir_name/masks" > /dev/null; then
+        rm -f "rembg_process/seeds/${dir_name}_0.png"
+        echo "frame/$dir_name/${dir_name}_0.jpg"
+    fi
+done | python rembg_process.py --stream -o ./rembg_process/seeds -m u2net
+
 for work_dir in frame/*/; do
     # 获取当前文件夹名
     dir_name=$(basename "$work_dir")
+    frame_dir="frame/$dir_name"
     echo "Processing directory: $dir_name" | tee -a progress.log
 
-    # 复制并重命名文件夹
-    echo "Copying and renaming $dir_name to 2d-gaussian-splatting/data/input" | tee -a progress.log
-    cp -r "$work_dir"/* 2d-gaussian-splatting/data/input
-    
-    cd 2d-gaussian-splatting
+    # 没有帧的物体（视频处理失败）直接跳过，不中断整个批次
+    if [ ! -f "$frame_dir/${dir_name}_0.jpg" ]; then
+        echo "No frames in $frame_dir, skipping $dir_name" | tee -a progress.log
+        continue
+    fi
 
-    python convert.py -s data
+    # 创建新的文件夹
+    new_gen_dir="2dgs_gen/$dir_name"
+    echo "Creating directory $new_gen_dir" | tee -a progress.log
+    mkdir -p "$new_gen_dir"
 
-    python train.py -s data
+    # COLMAP：帧没有变化时跳过（stage_manifest.py check 返回0表示可以跳过）
+    if python stage_manifest.py check -n "$dir_name" -s colmap -i "$frame_dir" -o "$new_gen_dir/data"; then
+        echo "COLMAP of $dir_name is up to date" | tee -a progress.log
+    else
+        # 复制并重命名文件夹
+        echo "Copying and renaming $dir_name to 2d-gaussian-splatting/data/input" | tee -a progress.log
+        cp -r "$work_dir"/* 2d-gaussian-splatting/data/input
 
-    # 获取output文件夹中的文件夹名
-    output_dir=$(ls output | head -n 1)
+        cd 2d-gaussian-splatting
 
+        python convert.py -s data
 
-    # 运行Python脚本
-    echo "Running Python script 'render.py' with output directory: $output_dir" | tee -a progress.log
-    python render.py -m "output/$output_dir" -s data
-    
-    cd ..
+        cd ..
 
-    # 创建新的文件夹
-    new_gen_dir="2dgs_gen/$dir_name"
-    echo "Creating directory $new_gen_dir" | tee -a progress.log
-    mkdir -p "$new_gen_dir"
+        # 复制data文件夹到新文件夹并重命名
+        echo "Copying data to $new_gen_dir/data" | tee -a progress.log
+        rm -rf "$new_gen_dir/data"
+        cp -r 2d-gaussian-splatting/data "$new_gen_dir/data"
+        rm -rf 2d-gaussian-splatting/data/*
+
+        python stage_manifest.py record -n "$dir_name" -s colmap -i "$frame_dir" -o "$new_gen_dir/data"
+    fi
+
+    # 2DGS训练：COLMAP结果没有变化时跳过
+    if python stage_manifest.py check -n "$dir_name" -s 2dgs -i "$new_gen_dir/data" -o "$new_gen_dir/output"; then
+        echo "2DGS of $dir_name is up to date" | tee -a progress.log
+    else
+        cp -r "$new_gen_dir/data"/* 2d-gaussian-splatting/data
 
-    # 复制data文件夹到新文件夹并重命名
-    echo "Copying data to $new_gen_dir/data" | tee -a progress.log
-    cp -r 2d-gaussian-splatting/data "$new_gen_dir/data"
-
-    # 复制output文件夹并重命名
-    echo "Copying and renaming the output directory to $new_gen_dir/output" | tee -a progress.log
-    cp -r "2d-gaussian-splatting/output/$output_dir" "$new_gen_dir/output"
-
-    # 清除2d-gaussian-splatting文件夹中的data和output文件夹
-    echo "Cleaning up data and output folders in 2d-gaussian-splatting..." | tee -a progress.log
-    rm -rf 2d-gaussian-splatting/data/*
-    rm -rf 2d-gaussian-splatting/output/*
-    
-    cp "frame/$dir_name/${dir_name}_0.jpg" rembg_process/in
-    
-    # 清除rembg和XMem文件夹内的图片
-    rm -rf rembg_process/in/*
-    rm -rf rembg_process/out/*
-    rm -rf pic/JPEGImages/video1/*
-    rm -rf pic/Annotations/video1/*
-    rm -rf pic/video1
-    
-    rm -rf masks/*
-    
-    
-    # 使用rembg或第一帧mask
-    python rembg_process.py -i "$dir_name" -o ./rembg_process/out -m u2net
+        cd 2d-gaussian-splatting
+
+        python train.py -s data
+
+        # 获取output文件夹中的文件夹名
+        output_dir=$(ls output | head -n 1)
+
+
+        # 运行Python脚本
+        echo "Running Python script 'render.py' with output directory: $output_dir" | tee -a progress.log
+        python render.py -m "output/$output_dir" -s data
+
+        cd ..
+
+        # 复制output文件夹并重命名
+        echo "Copying and renaming the output directory to $new_gen_dir/output" | tee -a progress.log
+        rm -rf "$new_gen_dir/output"
+        cp -r "2d-gaussian-splatting/output/$output_dir" "$new_gen_dir/output"
+
+        # 清除2d-gaussian-splatting文件夹中的data和output文件夹
+        echo "Cleaning up data and output folders in 2d-gaussian-splatting..." | tee -a progress.log
+        rm -rf 2d-gaussian-splatting/data/*
+        rm -rf 2d-gaussian-splatting/output/*
+
+        python stage_manifest.py record -n "$dir_name" -s 2dgs -i "$new_gen_dir/data" -o "$new_gen_dir/output"
+    fi
+
+    # rembg + XMem：帧和模型没有变化时跳过
+    if python stage_manifest.py check -n "$dir_name" -s masks -i "$frame_dir" -p model=u2net -o "$new_gen_dir/masks"; then
+        echo "Masks of $dir_name are up to date" | tee -a progress.log
+        continue
+    fi
+
+    # rembg没能分割第一帧时跳过该物体，其余物体照常处理
+    if [ ! -f "rembg_process/seeds/${dir_name}_0.png" ]; then
+        echo "No seed mask for $dir_name, skipping its masks" | tee -a progress.log
+        continue
+    fi
+
+    # 每个物体使用自己的XMem工作区，帧和第一帧mask以链接放入，不复制图片
+    workspace=$(python xmem_workspace.py prepare -n "$dir_name" -f "$frame_dir" -s "rembg_process/seeds/${dir_name}_0.png")
 
     # 使用XMem获取完整mask
-    python ./xmem/eval.py --model ./xmem/saves/XMem-s012.pth --generic_path ./pic --dataset G --output ./pic
-    
-    #复制mask
-    cp -r pic/video1/* masks
-    cp -r pic/video1/ "$new_gen_dir/masks"
-    
-    # 清除rembg和XMem文件夹内的图片
-    rm -rf rembg_process/in/*
-    rm -rf rembg_process/out/*
-    rm -rf pic/JPEGImages/video1/*
-    rm -rf pic/Annotations/video1/*
-    rm -rf pic/video1
-    
-    rm -rf masks/*
-    
-    
-    
-    
-    
-done
+    python ./xmem/eval.py --model ./xmem/saves/XMem-s012.pth --generic_path "$workspace" --dataset G --output "$workspace/out"
 
+    # 把mask移动到 $new_gen_dir/masks 并删除工作区
+    python xmem_workspace.py collect -n "$dir_name" -d "$new_gen_dir/masks"
 
+    python stage_manifest.py record -n "$dir_name" -s masks -i "$frame_dir" -p model=u2net -o "$new_gen_dir/masks"
+done
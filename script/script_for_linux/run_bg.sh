@@ -11,25 +11,6 @@ tmux send-keys -t progress "watch -n 1 tail -n 10 progress.log" C-m
 
 
 
-for work_dir in 2dgs_gen/*/; do
-    # 获取当前文件夹名
-    dir_name=$(basename "$work_dir")
-    echo "Processing directory: $dir_name" | tee -a progress.log
-
-
-    python file.py copy -n ${dir_name}
-    
-    python dilate.py -s 50
-    
-    python run.py -i ${dir_name}.ply
-    
-    python file.py delete
-    
-
-    
-    
-    
-    
-done
-
-
+# 每个物体在各自的文件夹中完成mask膨胀和去背景，多个物体并行处理（-j 设置进程数）
+# 额外参数会传给 auto_bg_process.py，例如 ./run_bg.sh --vote_ratio 0.8 按相机投票去背景
+python auto_bg_process.py -s 50 -j "$(nproc)" "$@"
@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+import argparse
+
+
+MANIFEST_DIR = './manifest'
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_files(path):
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        # Hidden files are caches derived from the folder (e.g. .scene_geometry.npz), not inputs
+        files.extend(os.path.join(root, name) for name in sorted(names) if not name.startswith('.'))
+    return files
+
+
+class StageManifest:
+    """
+    Per-object record of which pipeline stages ran on which inputs, kept in <manifest_dir>/<name>.json.
+    A stage is up to date when the content hash of its inputs and its parameters match the last
+    recorded run and all its outputs still exist. File hashes are reused while size and mtime are
+    unchanged, so checking a stage does not re-read unchanged inputs.
+    """
+    def __init__(self, name, manifest_dir=MANIFEST_DIR):
+        self.path = os.path.join(manifest_dir, f"{name}.json")
+        self.stages = {}
+        self.file_hashes = {}
+        if os.path.isfile(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+            self.stages = data.get("stages", {})
+            self.file_hashes = data.get("file_hashes", {})
+
+    def hash_inputs(self, inputs):
+        digest = hashlib.blake2b(digest_size=16)
+        for input_path in sorted(inputs):
+            # A missing input is part of the key, so the stage reruns once it shows up
+            if not os.path.exists(input_path):
+                digest.update(f"{input_path}:missing\n".encode())
+                continue
+            for path in list_files(input_path):
+                stat = os.stat(path)
+                cached = self.file_hashes.get(path)
+                if cached is None or cached[0] != stat.st_size or cached[1] != stat.st_mtime_ns:
+                    cached = self.file_hashes[path] = [stat.st_size, stat.st_mtime_ns, hash_file(path)]
+                digest.update(f"{os.path.relpath(path, input_path)}:{cached[2]}\n".encode())
+        return digest.hexdigest()
+
+    def stage_key(self, inputs, params=None):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.hash_inputs(inputs).encode())
+        digest.update(json.dumps(params or {}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def is_done(self, stage, inputs, params=None, outputs=()):
+        record = self.stages.get(stage)
+        if record is None or not all(os.path.exists(path) for path in outputs):
+            return False
+        return record["key"] == self.stage_key(inputs, params)
+
+    def record(self, stage, inputs, params=None, outputs=()):
+        self.stages[stage] = {"key": self.stage_key(inputs, params), "inputs": sorted(inputs),
+                              "params": params or {}, "outputs": list(outputs)}
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + ".tmp", 'w') as f:
+            json.dump({"stages": self.stages, "file_hashes": self.file_hashes}, f, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def parse_params(items):
+    params = {}
+    for item in items or []:
+        key, _, value = item.partition('=')
+        params[key] = value
+    return params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or record a pipeline stage of one object. "
+                                                 "'check' exits 0 when the stage can be skipped.")
+    parser.add_argument('action', choices=['check', 'record'])
+    parser.add_argument('-n', '--name', type=str, required=True, help="Object name.")
+    parser.add_argument('-s', '--stage', type=str, required=True, help="Stage name.")
+    parser.add_argument('-i', '--inputs', nargs='+', default=[], help="Input files or folders.")
+    parser.add_argument('-o', '--outputs', nargs='+', default=[], help="Output files or folders.")
+    parser.add_argument('-p', '--params', nargs='+', default=[], help="Stage parameters as key=value.")
+    parser.add_argument('--manifest_dir', type=str, default=MANIFEST_DIR, help="Folder holding the manifests.")
+    args = parser.parse_args()
+
+    manifest = StageManifest(args.name, args.manifest_dir)
+    params = parse_params(args.params)
+    if args.action == 'record':
+        manifest.record(args.stage, args.inputs, params, args.outputs)
+    else:
+        done = manifest.is_done(args.stage, args.inputs, params, args.outputs)
+        # Keep the refreshed file hashes so that the next check is cheap
+        if manifest.file_hashes:
+            manifest.save()
+        if done:
+            print(f"Stage {args.stage} of {args.name} is up to date, skipping")
+        raise SystemExit(0 if done else 1)
@@ -0,0 +1,56 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# scene/ pulls in the Gaussian model, which needs the CUDA extensions of the training environment
+pytest.importorskip("torch")
+pytest.importorskip("simple_knn._C")
+
+from scene.dataset_readers import readCamerasFromTransforms, readNerfSyntheticInfo
+
+
+def write_transforms_scene(path, num_frames=3, width=8, height=6, camera_angle_x=0.7):
+    os.makedirs(os.path.join(path, "train"))
+    rng = np.random.default_rng(0)
+    for split in ("train", "test"):
+        frames = []
+        for idx in range(num_frames):
+            file_path = f"./train/r_{split}_{idx}"
+            rgba = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+            Image.fromarray(rgba, "RGBA").save(os.path.join(path, file_path + ".png"))
+            transform = np.eye(4)
+            transform[:3, 3] = [0.0, -4.0 + idx, 0.5]
+            frames.append({"file_path": file_path, "transform_matrix": transform.tolist()})
+        with open(os.path.join(path, f"transforms_{split}.json"), "w") as f:
+            json.dump({"camera_angle_x": camera_angle_x, "frames": frames}, f)
+
+
+def test_read_cameras_from_transforms(tmp_path):
+    write_transforms_scene(str(tmp_path))
+
+    cam_infos = readCamerasFromTransforms(str(tmp_path), "transforms_train.json", white_background=False)
+
+    assert len(cam_infos) == 3
+    for idx, cam_info in enumerate(cam_infos):
+        assert cam_info.image_name == f"r_train_{idx}"
+        assert (cam_info.width, cam_info.height) == (8, 6)
+        assert cam_info.image.size == (8, 6)
+        assert cam_info.FovX == pytest.approx(0.7)
+        assert cam_info.FocalX == pytest.approx(8 / (2 * np.tan(0.35)))
+        assert cam_info.FocalY == cam_info.FocalX
+        # With an identity rotation only the X axis keeps its sign after the OpenGL to COLMAP flip
+        np.testing.assert_allclose(cam_info.T, [0.0, -4.0 + idx, 0.5], atol=1e-12)
+
+
+def test_read_nerf_synthetic_info(tmp_path):
+    write_transforms_scene(str(tmp_path))
+
+    scene_info = readNerfSyntheticInfo(str(tmp_path), white_background=True, eval=True)
+
+    assert len(scene_info.train_cameras) == 3
+    assert len(scene_info.test_cameras) == 3
+    assert os.path.isfile(scene_info.ply_path)
+    assert scene_info.point_cloud is not None
@@ -126,12 +126,11 @@ path_to_cameras_bin = 'cameras.bin'
 path_to_cameras_extrinsic_file = "images.bin"
 path_to_cameras_intrinsic_file = "cameras.bin"
 images_folder = "images"
-ex_images_data = read_extrinsics_binary(path_to_images_bin)
 in_images_data = read_intrinsics_binary(path_to_cameras_bin)
-cam_extrinsics = read_extrinsics_binary(path_to_cameras_extrinsic_file)
+cam_extrinsics = read_extrinsics_binary(path_to_cameras_extrinsic_file, poses_only=True)
 cam_intrinsics = read_intrinsics_binary(path_to_cameras_intrinsic_file)
 cam_infos = readColmapCameras(cam_extrinsics=cam_extrinsics, cam_intrinsics=cam_intrinsics,
-                              images_folder=images_folder)
+                              images_folder=images_folder, load_images=False)
 camera_intrinsics = []
 camera_extrinsics = []
 for camera in cam_infos:
@@ -162,7 +161,5 @@ print("binary_masks", binary_masks)
 # print("pcd:", pcd)
 
 output_folder_path = 'output_mask'
-# 首先处理掩码
-masks = process_masks(mask_folder_path)
 
 filtered_pcd = project_and_filter(cam_infos, binary_masks)
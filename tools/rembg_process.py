@@ -1,8 +1,20 @@
 import os
+import sys
 import argparse
+from itertools import islice
+import numpy as np
 from PIL import Image
 from rembg import new_session, remove
+from rembg.bg import post_process
 import shutil
+from xmem_workspace import link_tree, LINK_MODES
+
+
+# u2net系列模型的输入尺寸和归一化参数，与rembg内部的预处理一致
+U2NET_MODELS = ('u2net', 'u2netp', 'u2net_human_seg', 'silueta')
+U2NET_SIZE = (320, 320)
+U2NET_MEAN = np.array([0.485, 0.456, 0.406])
+U2NET_STD = np.array([0.229, 0.224, 0.225])
 
 
 def copy_image_to_rembg_process_in(source_folder):
@@ -22,27 +34,110 @@ def copy_image_to_rembg_process_in(source_folder):
         print(f"File {source_file} does not exist.")
 
 
-def rembg_process(output_folder_path, model):
+def create_session(model, threads=None):
+    # rembg根据OMP_NUM_THREADS设置onnxruntime的intra-op/inter-op线程数
+    if threads:
+        os.environ['OMP_NUM_THREADS'] = str(threads)
+    return new_session(model)
+
+
+def preprocess_batch(images, size=U2NET_SIZE):
+    # 逐张缩放后堆叠成(N, H, W, 3)，归一化和转NCHW对整个batch一次完成
+    # 和rembg的U2netSession一样先用float64归一化，最后才转成float32，保证输入张量与逐张处理一致
+    batch = np.stack([np.asarray(image.convert('RGB').resize(size, Image.LANCZOS)) for image in images])
+    batch = batch / np.maximum(batch.max(axis=(1, 2, 3), keepdims=True), 1e-6)
+    batch = (batch - U2NET_MEAN) / U2NET_STD
+    return np.ascontiguousarray(batch.astype(np.float32).transpose(0, 3, 1, 2))
+
+
+def predict_masks(images, session, post_process_mask=True):
+    # 整个batch作为一个张量送入onnxruntime；模型的batch维固定为1时逐张运行
+    inner_session = session.inner_session
+    model_input = inner_session.get_inputs()[0]
+    batch = preprocess_batch(images)
+    if model_input.shape[0] == 1:
+        preds = np.concatenate([inner_session.run(None, {model_input.name: batch[i:i + 1]})[0]
+                                for i in range(batch.shape[0])])
+    else:
+        preds = inner_session.run(None, {model_input.name: batch})[0]
+
+    preds = preds[:, 0]
+    mins = preds.min(axis=(1, 2), keepdims=True)
+    maxs = preds.max(axis=(1, 2), keepdims=True)
+    preds = ((preds - mins) / (maxs - mins) * 255).astype(np.uint8)
+
+    masks = []
+    for pred, image in zip(preds, images):
+        mask = Image.fromarray(pred, mode='L').resize(image.size, Image.LANCZOS)
+        if post_process_mask:
+            mask = Image.fromarray(post_process(np.array(mask)))
+        masks.append(mask)
+    return masks
+
+
+def segment_images(image_paths, output_folder_path, session, batch_size=1):
+    # 同一个session处理所有图片，模型只加载一次；image_paths可以是任意可迭代对象（例如stdin）
+    # batch_size>1且是u2net系列模型时按batch推理，其他模型仍交给rembg逐张处理
+    os.makedirs(output_folder_path, exist_ok=True)
+    if getattr(session, 'model_name', None) not in U2NET_MODELS:
+        batch_size = 1
+    image_paths = iter(image_paths)
+    while True:
+        paths = list(islice(image_paths, batch_size))
+        if not paths:
+            break
+        images = [Image.open(image_path) for image_path in paths]
+        if batch_size > 1:
+            masks = predict_masks(images, session)
+        else:
+            masks = [remove(images[0], session=session, only_mask=True, post_process_mask=True)]
+        for image_path, mask in zip(paths, masks):
+            image_name, _ = os.path.splitext(os.path.basename(image_path))
+            output_path = os.path.join(output_folder_path, f"{image_name}.png")
+            mask.save(output_path)
+            yield output_path
+
+
+def rembg_process(output_folder_path, model, session=None, batch_size=1):
     input_folder_path = './rembg_process/in'
     # 获取文件夹中所有的图片
     images = [f for f in os.listdir(input_folder_path) if f.endswith('.jpg')]
     # 按照你的命名规则对图片进行排序
     images.sort(key=lambda x: int(x.split('_')[-1].split('.')[0]))
 
-    for i, img_name in enumerate(images, start=1):
-        image_path = os.path.join(input_folder_path, img_name)
-        image = Image.open(image_path)
-        extracted_count = 0
-        image_name, _ = os.path.splitext(img_name)
-        # print("image name: ", image_name)
-
-        output = remove(image, session=new_session(model), only_mask=True, post_process_mask=True)
-        new_name = f"{image_name}.png"
-        output.save(os.path.join(output_folder_path, new_name))
-        extracted_count += 1
-
-
-def clear_and_copy_files(output_folder, input_folder):
+    if session is None:
+        session = new_session(model)
+    image_paths = [os.path.join(input_folder_path, img_name) for img_name in images]
+    return list(segment_images(image_paths, output_folder_path, session, batch_size))
+
+
+def serve(output_folder_path, model, batch_size=1, threads=None):
+    # 常驻进程：只创建一次session，从stdin逐行读取图片路径，每写出一个mask就输出它的路径
+    # 某张图片缺失或无法读取时只在stderr报告并跳过，不结束进程
+    session = create_session(model, threads)
+    image_paths = (line.strip() for line in sys.stdin if line.strip())
+    while True:
+        paths = list(islice(image_paths, batch_size))
+        if not paths:
+            break
+        try:
+            output_paths = list(segment_images(paths, output_folder_path, session, batch_size))
+        except Exception as e:
+            if len(paths) == 1:
+                print(f"Failed to segment {paths[0]}: {e}", file=sys.stderr, flush=True)
+                continue
+            # batch中有出错的图片时逐张重试，只跳过出错的那张
+            output_paths = []
+            for image_path in paths:
+                try:
+                    output_paths.extend(segment_images([image_path], output_folder_path, session))
+                except Exception as e:
+                    print(f"Failed to segment {image_path}: {e}", file=sys.stderr, flush=True)
+        for output_path in output_paths:
+            print(output_path, flush=True)
+
+
+def clear_and_copy_files(output_folder, input_folder, link='auto'):
     annotations_folder = './pic/Annotations/video1'
     jpegimages_folder = './pic/JPEGImages/video1'
     frame_input_folder = os.path.join('./frame', input_folder)
@@ -66,23 +161,9 @@ def clear_and_copy_files(output_folder, input_folder):
             except Exception as e:
                 print(f'Failed to delete {file_path}. Reason: {e}')
 
-    # 复制文件到 ./pic/Annotations/video1 文件夹
-    for item in os.listdir(output_folder):
-        s = os.path.join(output_folder, item)
-        d = os.path.join(annotations_folder, item)
-        if os.path.isdir(s):
-            shutil.copytree(s, d, dirs_exist_ok=True)
-        else:
-            shutil.copy2(s, d)
-
-    # 复制文件到 ./pic/JPEGImages/video1 文件夹
-    for item in os.listdir(frame_input_folder):
-        s = os.path.join(frame_input_folder, item)
-        d = os.path.join(jpegimages_folder, item)
-        if os.path.isdir(s):
-            shutil.copytree(s, d, dirs_exist_ok=True)
-        else:
-            shutil.copy2(s, d)
+    # 以链接代替复制放入 ./pic/Annotations/video1 和 ./pic/JPEGImages/video1 文件夹
+    link_tree(output_folder, annotations_folder, link)
+    link_tree(frame_input_folder, jpegimages_folder, link)
 
 
 
@@ -98,9 +179,24 @@ if __name__ == '__main__':
     parser.add_argument('-i', '--input_folder', type=str, help="Path to the input video file.")
     parser.add_argument('-o', '--output_folder', type=str, default= './rembg_process/out', help="Folder to save the extracted frames.")
     parser.add_argument('-m', '--model', type=str, default= 'u2net', help="Target number of frames to extract.")
+    parser.add_argument('-l', '--link', type=str, default='auto', choices=LINK_MODES, help="How frames and masks are put into ./pic: hard/sym link or copy, auto tries them in this order.")
+    parser.add_argument('--stream', action='store_true', help="Read image paths from stdin and write their masks to the output folder.")
+    parser.add_argument('--images', nargs='+', help="Segment these frames (e.g. several XMem seed frames) and write their masks to the output folder.")
+    parser.add_argument('-b', '--batch_size', type=int, default=1, help="Number of images per onnxruntime run (u2net models).")
+    parser.add_argument('-t', '--threads', type=int, default=None, help="onnxruntime intra-op threads, exported as OMP_NUM_THREADS.")
 
     args = parser.parse_args()
 
+    if args.stream:
+        serve(args.output_folder, args.model, args.batch_size, args.threads)
+        sys.exit(0)
+
+    if args.images:
+        session = create_session(args.model, args.threads)
+        for output_path in segment_images(args.images, args.output_folder, session, args.batch_size):
+            print(output_path)
+        sys.exit(0)
+
     copy_image_to_rembg_process_in(args.input_folder)
-    rembg_process(args.output_folder, args.model)
-    clear_and_copy_files(args.output_folder, args.input_folder)
\ No newline at end of file
+    rembg_process(args.output_folder, args.model, create_session(args.model, args.threads), args.batch_size)
+    clear_and_copy_files(args.output_folder, args.input_folder, args.link)
\ No newline at end of file
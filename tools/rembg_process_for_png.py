@@ -1,8 +1,10 @@
 import os
+import sys
 import argparse
 from PIL import Image
 from rembg import new_session, remove
 import shutil
+from xmem_workspace import link_tree, LINK_MODES
 
 
 def copy_image_to_rembg_process_in(source_folder):
@@ -22,27 +24,46 @@ def copy_image_to_rembg_process_in(source_folder):
         print(f"File {source_file} does not exist.")
 
 
-def rembg_process(output_folder_path, model):
+def segment_images(image_paths, output_folder_path, session):
+    # 同一个session处理所有图片，模型只加载一次；image_paths可以是任意可迭代对象（例如stdin）
+    os.makedirs(output_folder_path, exist_ok=True)
+    for image_path in image_paths:
+        image_name, _ = os.path.splitext(os.path.basename(image_path))
+        output = remove(Image.open(image_path), session=session, only_mask=True, post_process_mask=True)
+        output_path = os.path.join(output_folder_path, f"{image_name}.png")
+        output.save(output_path)
+        yield output_path
+
+
+def rembg_process(output_folder_path, model, session=None):
     input_folder_path = './rembg_process/in'
     # 获取文件夹中所有的图片
     images = [f for f in os.listdir(input_folder_path) if f.endswith('.png')]
     # 按照你的命名规则对图片进行排序
     images.sort(key=lambda x: int(x.split('_')[-1].split('.')[0]))
 
-    for i, img_name in enumerate(images, start=1):
-        image_path = os.path.join(input_folder_path, img_name)
-        image = Image.open(image_path)
-        extracted_count = 0
-        image_name, _ = os.path.splitext(img_name)
-        # print("image name: ", image_name)
+    if session is None:
+        session = new_session(model)
+    image_paths = [os.path.join(input_folder_path, img_name) for img_name in images]
+    return list(segment_images(image_paths, output_folder_path, session))
+
 
-        output = remove(image, session=new_session(model), only_mask=True, post_process_mask=True)
-        new_name = f"{image_name}.png"
-        output.save(os.path.join(output_folder_path, new_name))
-        extracted_count += 1
+def serve(output_folder_path, model):
+    # 常驻进程：只创建一次session，从stdin逐行读取图片路径，每写出一个mask就输出它的路径
+    # 某张图片缺失或无法读取时只在stderr报告并跳过，不结束进程
+    session = new_session(model)
+    for line in sys.stdin:
+        image_path = line.strip()
+        if not image_path:
+            continue
+        try:
+            for output_path in segment_images([image_path], output_folder_path, session):
+                print(output_path, flush=True)
+        except Exception as e:
+            print(f"Failed to segment {image_path}: {e}", file=sys.stderr, flush=True)
 
 
-def clear_and_copy_files(output_folder, input_folder):
+def clear_and_copy_files(output_folder, input_folder, link='auto'):
     annotations_folder = './pic/Annotations/video1'
     jpegimages_folder = './pic/JPEGImages/video1'
     frame_input_folder = os.path.join('./frame', input_folder)
@@ -66,23 +87,9 @@ def clear_and_copy_files(output_folder, input_folder):
             except Exception as e:
                 print(f'Failed to delete {file_path}. Reason: {e}')
 
-    # 复制文件到 ./pic/Annotations/video1 文件夹
-    for item in os.listdir(output_folder):
-        s = os.path.join(output_folder, item)
-        d = os.path.join(annotations_folder, item)
-        if os.path.isdir(s):
-            shutil.copytree(s, d, dirs_exist_ok=True)
-        else:
-            shutil.copy2(s, d)
-
-    # 复制文件到 ./pic/JPEGImages/video1 文件夹
-    for item in os.listdir(frame_input_folder):
-        s = os.path.join(frame_input_folder, item)
-        d = os.path.join(jpegimages_folder, item)
-        if os.path.isdir(s):
-            shutil.copytree(s, d, dirs_exist_ok=True)
-        else:
-            shutil.copy2(s, d)
+    # 以链接代替复制放入 ./pic/Annotations/video1 和 ./pic/JPEGImages/video1 文件夹
+    link_tree(output_folder, annotations_folder, link)
+    link_tree(frame_input_folder, jpegimages_folder, link)
 
 
 
@@ -98,9 +105,15 @@ if __name__ == '__main__':
     parser.add_argument('-i', '--input_folder', type=str, help="Path to the input video file.")
     parser.add_argument('-o', '--output_folder', type=str, default= './rembg_process/out', help="Folder to save the extracted frames.")
     parser.add_argument('-m', '--model', type=str, default= 'u2net', help="Target number of frames to extract.")
+    parser.add_argument('-l', '--link', type=str, default='auto', choices=LINK_MODES, help="How frames and masks are put into ./pic: hard/sym link or copy, auto tries them in this order.")
+    parser.add_argument('--stream', action='store_true', help="Read image paths from stdin and write their masks to the output folder.")
 
     args = parser.parse_args()
 
+    if args.stream:
+        serve(args.output_folder, args.model)
+        sys.exit(0)
+
     copy_image_to_rembg_process_in(args.input_folder)
     rembg_process(args.output_folder, args.model)
-    clear_and_copy_files(args.output_folder, args.input_folder)
+    clear_and_copy_files(args.output_folder, args.input_folder, args.link)
@@ -1,52 +1,35 @@
 import os
-from PIL import Image
-
-def process_images_in_folder(input_folder, mask_folder, output_folder):
-    # 确保输出文件夹存在，如果不存在则创建
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    # 获取输入文件夹中的所有图片文件
-    input_images = sorted(os.listdir(input_folder))
-    mask_images = sorted(os.listdir(mask_folder))
-
-    for input_image, mask_image in zip(input_images, mask_images):
-        input_image_path = os.path.join(input_folder, input_image)
-        mask_image_path = os.path.join(mask_folder, mask_image)
-        output_image_path = os.path.join(output_folder, input_image)
-
-        # 检查文件扩展名是否为图片格式
-        if input_image.endswith(('png', 'jpg', 'jpeg')) and mask_image.endswith(('png', 'jpg', 'jpeg')):
-            process_image(input_image_path, mask_image_path, output_image_path)
-            print(f"Processed: {input_image}")
-
-def process_image(image_path, mask_path, output_path):
-    # 打开原始图像和mask图像
-    image = Image.open(image_path).convert("RGBA")
-    mask = Image.open(mask_path).convert("L")  # 只需要mask的灰度信息
-
-    # 创建一个与原图像尺寸相同的空白RGBA图像，背景设置为透明
-    new_image = Image.new("RGBA", image.size, (0, 0, 0, 0))
-
-    # 将mask的白色区域（255）设置为0，黑色区域（0）设置为1
-    mask = mask.point(lambda p: 255 if p == 0 else 0)
-
-    # 遍历mask，将物体区域设置为透明
-    for y in range(mask.size[1]):
-        for x in range(mask.size[0]):
-            if mask.getpixel((x, y)) == 0:  # mask的物体区域
-                new_image.putpixel((x, y), image.getpixel((x, y)))
-            else:
-                # 背景区域保持透明
-                new_image.putpixel((x, y), (0, 0, 0, 0))
-
-    # 保存处理后的图像
-    new_image.save(output_path, "PNG")
-
-# 文件夹路径
-input_folder = "./frame_exchange/images"  # 原始图片文件夹
-mask_folder = "./frame_exchange/masks"  # mask图片文件夹
-output_folder = "./frame_exchange/save1"  # 输出图片文件夹
-
-# 批量处理整个文件夹中的图片
-process_images_in_folder(input_folder, mask_folder, output_folder)
+import argparse
+from utils.composite_utils import composite_file, composite_folder
+
+
+def process_images_in_folder(input_folder, mask_folder, output_folder, fmt='png', compression=None, workers=None):
+    # 按文件名匹配原图和mask，用线程池批量处理；默认保持原文件名并以PNG编码保存
+    written, failed = composite_folder(input_folder, mask_folder, output_folder, mode='transparent', fmt=fmt,
+                                       compression=compression, workers=workers, keep_name=(fmt == 'png'))
+    for output_path in written:
+        print(f"Processed: {os.path.basename(output_path)}")
+    for image_name, reason in failed.items():
+        print(f"Failed: {image_name} ({reason})")
+    return written
+
+
+def process_image(image_path, mask_path, output_path, fmt='png', compression=None):
+    # mask为0的背景区域整体设为透明(0, 0, 0, 0)，物体区域保留原像素
+    return composite_file(image_path, mask_path, output_path, mode='transparent', fmt=fmt, compression=compression)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cut objects out of images with their masks.")
+    # 文件夹路径
+    parser.add_argument('-i', '--input_folder', type=str, default="./frame_exchange/images", help="原始图片文件夹")
+    parser.add_argument('-m', '--mask_folder', type=str, default="./frame_exchange/masks", help="mask图片文件夹")
+    parser.add_argument('-o', '--output_folder', type=str, default="./frame_exchange/save1", help="输出图片文件夹")
+    parser.add_argument('-f', '--format', type=str, default='png', choices=['png', 'webp'], help="输出格式")
+    parser.add_argument('-c', '--compression', type=int, default=None, help="PNG压缩等级(0-9)或WebP质量(1-100，大于100为无损)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="线程数")
+    args = parser.parse_args()
+
+    # 批量处理整个文件夹中的图片
+    process_images_in_folder(args.input_folder, args.mask_folder, args.output_folder, args.format, args.compression,
+                             args.workers)
@@ -0,0 +1,121 @@
+import os
+import shutil
+import argparse
+
+
+WORKSPACE_ROOT = './xmem_workspace'
+LINK_MODES = ['auto', 'hard', 'sym', 'copy']
+
+
+def link_file(src, dst, mode='auto'):
+    # auto：优先硬链接，跨文件系统时改用符号链接，都不支持时才复制
+    if mode in ('auto', 'hard'):
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            if mode == 'hard':
+                raise
+    if mode in ('auto', 'sym'):
+        try:
+            os.symlink(os.path.abspath(src), dst)
+            return
+        except OSError:
+            if mode == 'sym':
+                raise
+    shutil.copy2(src, dst)
+
+
+def link_tree(src_folder, dst_folder, mode='auto'):
+    # 目标文件夹本身是真实目录，里面的文件是源文件的链接，不复制图片数据
+    os.makedirs(dst_folder, exist_ok=True)
+    count = 0
+    for item in sorted(os.listdir(src_folder)):
+        s = os.path.join(src_folder, item)
+        d = os.path.join(dst_folder, item)
+        if os.path.isdir(s):
+            count += link_tree(s, d, mode)
+            continue
+        if os.path.lexists(d):
+            os.unlink(d)
+        link_file(s, d, mode)
+        count += 1
+    return count
+
+
+def clear_folder(folder):
+    if os.path.islink(folder) or os.path.isfile(folder):
+        os.unlink(folder)
+    elif os.path.isdir(folder):
+        shutil.rmtree(folder)
+
+
+def workspace_path(name, root=WORKSPACE_ROOT):
+    return os.path.join(root, name)
+
+
+def prepare_workspace(name, frame_folder, seed_masks, root=WORKSPACE_ROOT, mode='auto'):
+    """
+    建立物体自己的XMem工作区 <root>/<name>/{JPEGImages,Annotations}/<name>，帧和第一帧mask都以链接放入。
+    不同物体的工作区互不影响，XMem的 --generic_path 指向返回的路径即可。
+    """
+    workspace = workspace_path(name, root)
+    clear_folder(workspace)
+    link_tree(frame_folder, os.path.join(workspace, 'JPEGImages', name), mode)
+    annotations_folder = os.path.join(workspace, 'Annotations', name)
+    os.makedirs(annotations_folder, exist_ok=True)
+    for seed_mask in seed_masks:
+        link_file(seed_mask, os.path.join(annotations_folder, os.path.basename(seed_mask)), mode)
+    return workspace
+
+
+def output_folder(name, root=WORKSPACE_ROOT):
+    # XMem的 --output 设为 <工作区>/out，mask写在 out/<name> 中
+    return os.path.join(workspace_path(name, root), 'out')
+
+
+def iter_masks(name, root=WORKSPACE_ROOT):
+    # 在同一进程中逐个取XMem输出的mask路径，不需要先复制到其他文件夹
+    masks_folder = os.path.join(output_folder(name, root), name)
+    for item in sorted(os.listdir(masks_folder)):
+        yield os.path.join(masks_folder, item)
+
+
+def collect_masks(name, destination, root=WORKSPACE_ROOT, keep_workspace=False):
+    """
+    把XMem输出移动（同一文件系统上只是重命名）到destination，然后删除工作区。
+    """
+    masks_folder = os.path.join(output_folder(name, root), name)
+    if not os.path.isdir(masks_folder):
+        raise FileNotFoundError(f"XMem output not found: {masks_folder}")
+    clear_folder(destination)
+    os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+    shutil.move(masks_folder, destination)
+    if not keep_workspace:
+        clear_folder(workspace_path(name, root))
+    return destination
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-object XMem workspace built from links instead of copies.")
+    parser.add_argument('action', choices=['prepare', 'collect', 'clean'])
+    parser.add_argument('-n', '--name', type=str, required=True, help="Object name, also used as XMem video name.")
+    parser.add_argument('-f', '--frame_folder', type=str, help="Folder holding the frames of the object (prepare).")
+    parser.add_argument('-s', '--seed_masks', nargs='+', default=[], help="First frame masks for XMem (prepare).")
+    parser.add_argument('-d', '--destination', type=str, help="Folder to move the XMem masks to (collect).")
+    parser.add_argument('-l', '--link', type=str, default='auto', choices=LINK_MODES, help="hard/sym link or copy, auto tries them in this order.")
+    parser.add_argument('--root', type=str, default=WORKSPACE_ROOT, help="Folder holding the workspaces.")
+    parser.add_argument('--keep_workspace', action='store_true', help="Do not delete the workspace after collect.")
+    args = parser.parse_args()
+
+    if args.action == 'prepare':
+        if not args.frame_folder or not args.seed_masks:
+            parser.error("prepare needs -f and -s")
+        # 输出工作区路径，shell脚本直接传给XMem
+        print(prepare_workspace(args.name, args.frame_folder, args.seed_masks, args.root, args.link))
+    elif args.action == 'collect':
+        if not args.destination:
+            parser.error("collect needs -d")
+        collect_masks(args.name, args.destination, args.root, args.keep_workspace)
+    else:
+        clear_folder(workspace_path(args.name, args.root))
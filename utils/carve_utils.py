@@ -0,0 +1,393 @@
+import os
+import json
+import tempfile
+import cv2
+import numpy as np
+from plyfile import PlyData, PlyElement
+from scene.geometry_cache import load_scene_geometry
+from scene.dataset_readers import readColmapCamerasFromGeometry
+from utils.graphics_utils import getWorld2ViewBatch
+
+
+def load_colmap_cameras(sparse_path, images_folder):
+    """
+    Read cam_infos from a COLMAP model folder holding cameras/images as .bin or .txt.
+    Only the camera geometry is loaded, the frames themselves are never opened. The stacked
+    camera arrays are cached next to the model, see scene.geometry_cache.
+    """
+    return readColmapCamerasFromGeometry(load_scene_geometry(sparse_path), images_folder, load_images=False)
+
+
+def iter_binary_masks(mask_folder_path, threshold=30):
+    """
+    Yield (name, mask) for every mask in the folder thresholded to 0/1, name without extension.
+    Fully zero masks are skipped so that their cameras take no part in carving.
+    """
+    for mask_filename in sorted(os.listdir(mask_folder_path)):
+        mask_path = os.path.join(mask_folder_path, mask_filename)
+        if os.path.isfile(mask_path):
+            image = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                raise IOError(f"Failed to load the mask {mask_path}")
+            _, binary_mask = cv2.threshold(image, threshold, 1, cv2.THRESH_BINARY)
+            if np.any(binary_mask):
+                yield os.path.splitext(mask_filename)[0], binary_mask
+            else:
+                print("Binary mask is fully zero. Skipping:", mask_filename)
+
+
+def load_binary_masks(mask_folder_path, threshold=30):
+    """
+    Threshold every mask in the folder to a 0/1 uint8 array, keyed by file name without extension.
+    """
+    return dict(iter_binary_masks(mask_folder_path, threshold))
+
+
+class PackedMasks:
+    """
+    0/1 masks stored one bit per pixel in a single uint8 buffer (np.packbits order), each mask
+    starting on a byte boundary. Behaves like the dict returned by load_binary_masks for
+    membership tests and item access, the latter unpacking a single mask.
+    """
+    def __init__(self, names, heights, widths, bits):
+        self.names = list(names)
+        self.index = {name: idx for idx, name in enumerate(self.names)}
+        self.heights = np.asarray(heights, dtype=np.int64)
+        self.widths = np.asarray(widths, dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum((self.heights * self.widths + 7) // 8)[:-1])).astype(np.int64)
+        self.bits = bits
+
+    @classmethod
+    def from_masks(cls, binary_masks):
+        names = list(binary_masks)
+        masks = [binary_masks[name] for name in names]
+        bits = np.concatenate([np.packbits(mask.ravel()) for mask in masks]) if masks else np.empty(0, np.uint8)
+        return cls(names, [mask.shape[0] for mask in masks], [mask.shape[1] for mask in masks], bits)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def keys(self):
+        return list(self.names)
+
+    def __getitem__(self, name):
+        idx = self.index[name]
+        height, width = self.heights[idx], self.widths[idx]
+        start = self.offsets[idx]
+        packed = self.bits[start:start + (height * width + 7) // 8]
+        return np.unpackbits(packed, count=height * width).reshape(height, width)
+
+    def expected_nbytes(self):
+        # Size the bits buffer must have for these names and shapes
+        return int(np.sum((self.heights * self.widths + 7) // 8))
+
+    def lookup(self, mask_idx, pixel_idx):
+        """
+        Value of pixel pixel_idx (row-major) of mask mask_idx, both arrays of the same shape.
+        """
+        byte = self.bits[self.offsets[mask_idx] + (pixel_idx >> 3)]
+        return (byte >> (7 - (pixel_idx & 7))) & 1
+
+
+def _mask_folder_mtime(mask_folder_path):
+    # Adding/removing a mask changes the folder, overwriting one in place only changes the file
+    mtime = os.stat(mask_folder_path).st_mtime_ns
+    for entry in os.scandir(mask_folder_path):
+        if entry.is_file():
+            mtime = max(mtime, entry.stat().st_mtime_ns)
+    return mtime
+
+
+# mkstemp creates owner-only files, the caches get the permissions a plain open() would give them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _replace_atomically(path, write):
+    # Each writer gets its own temporary file next to path, so concurrent workers never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_packed_masks(mask_folder_path, threshold=30, cache_dir=None):
+    """
+    Bit-packed version of load_binary_masks, cached next to the mask folder as
+    .<folder>_t<threshold>.npy (memory-mapped on load) plus a .json index. The cache is
+    rebuilt whenever a mask is newer than it, so later runs skip PNG decoding entirely.
+    """
+    mask_folder_path = os.path.normpath(mask_folder_path)
+    if cache_dir is None:
+        cache_dir = os.path.dirname(os.path.abspath(mask_folder_path))
+    cache_name = f".{os.path.basename(mask_folder_path)}_t{threshold}"
+    bits_path = os.path.join(cache_dir, cache_name + ".npy")
+    index_path = os.path.join(cache_dir, cache_name + ".json")
+    mtime = _mask_folder_mtime(mask_folder_path)
+
+    if os.path.isfile(bits_path) and os.path.isfile(index_path):
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+            if index["mtime"] == mtime and index["threshold"] == threshold:
+                bits = np.load(bits_path, mmap_mode='r')
+                packed = PackedMasks(index["names"], index["heights"], index["widths"], bits)
+                # The .npy and the .json are replaced one after the other, so a reader can pair an index
+                # with the bits of another write; only trust them when the sizes agree
+                if len(packed.names) == len(packed.heights) == len(packed.widths) and bits.ndim == 1 \
+                        and bits.shape[0] == packed.expected_nbytes():
+                    return packed
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable mask cache {bits_path}: {e}")
+
+    packed = PackedMasks.from_masks(load_binary_masks(mask_folder_path, threshold))
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to per-process temporary names first so that readers never see half a file
+    _replace_atomically(bits_path, lambda f: np.save(f, packed.bits))
+    index = {"mtime": mtime, "threshold": threshold, "names": packed.names,
+             "heights": packed.heights.tolist(), "widths": packed.widths.tolist()}
+    _replace_atomically(index_path, lambda f: f.write(json.dumps(index).encode()))
+    return packed
+
+
+def load_vertices(ply_file_path):
+    # The vertex table is read once and kept in memory for every view
+    return PlyData.read(ply_file_path)['vertex'].data
+
+
+def save_vertices(vertices, output_file_path, text=False):
+    vertex_element = PlyElement.describe(vertices, 'vertex')
+    PlyData([vertex_element], text=text, byte_order='<').write(output_file_path)
+
+
+def save_mesh(vertices, faces, output_file_path, text=False):
+    """
+    Write a triangle mesh, binary little-endian unless text is set.
+    The face list is built as one structured array instead of per-face tuples.
+    """
+    vertex_element = PlyElement.describe(vertices, 'vertex')
+    face_data = np.empty(faces.shape[0], dtype=[('vertex_indices', 'i4', (3,))])
+    face_data['vertex_indices'] = faces
+    face_element = PlyElement.describe(face_data, 'face')
+    PlyData([vertex_element, face_element], text=text, byte_order='<').write(output_file_path)
+
+
+def load_mesh(ply_file_path):
+    """
+    Read a triangle mesh as its vertex table and an (F, 3) array of vertex indices.
+    """
+    pcd = PlyData.read(ply_file_path, known_list_len={'face': {'vertex_indices': 3}})
+    faces = pcd['face'].data['vertex_indices']
+    if faces.dtype == object:
+        # ASCII files are parsed as per-face lists regardless of known_list_len
+        faces = np.stack(faces)
+    return pcd['vertex'].data, faces
+
+
+def carve_mesh_arrays(vertices, faces, keep):
+    """
+    Drop every face that uses a removed vertex, then compact the vertex table to the
+    vertices still referenced by a face and renumber the faces accordingly.
+    :return: (vertices, faces) of the carved mesh, faces as an (F, 3) int32 array.
+    """
+    faces = faces[keep[faces].all(axis=1)]
+    referenced = np.zeros(vertices.shape[0], dtype=bool)
+    referenced[faces.ravel()] = True
+    new_index = np.cumsum(referenced) - 1
+    return vertices[referenced], new_index[faces].astype(np.int32)
+
+
+def vertex_positions(vertices):
+    return np.stack((vertices["x"], vertices["y"], vertices["z"]), axis=1)
+
+
+def stack_projections(cam_infos):
+    """
+    Stack K @ [R|t] of every camera into a single (C, 3, 4) float32 array.
+    """
+    CAMERA_INTRINSICS = np.zeros((len(cam_infos), 3, 3))
+    CAMERA_INTRINSICS[:, 0, 0] = [camera.FocalX for camera in cam_infos]
+    CAMERA_INTRINSICS[:, 1, 1] = [camera.FocalY for camera in cam_infos]
+    CAMERA_INTRINSICS[:, 0, 2] = [camera.width / 2 for camera in cam_infos]
+    CAMERA_INTRINSICS[:, 1, 2] = [camera.height / 2 for camera in cam_infos]
+    CAMERA_INTRINSICS[:, 2, 2] = 1
+    C2W = getWorld2ViewBatch(np.array([camera.R for camera in cam_infos]), np.array([camera.T for camera in cam_infos]))
+    return (CAMERA_INTRINSICS @ C2W[:, :3, :]).astype(np.float32)
+
+
+def count_mask_votes(points, cam_infos, binary_masks, memory_budget=256 * 1024 ** 2):
+    """
+    Project N points into all C masked cameras at once, in chunks of points sized so that
+    the intermediates stay within memory_budget bytes (the returned counts not included).
+    A point is visible in a camera when it projects inside the image, and kept by it when the
+    mask pixel it lands on is 1.
+    :return: (visible, kept) int32 arrays of shape (N,).
+    """
+    cam_infos = [camera for camera in cam_infos if camera.image_name in binary_masks]
+    num_points = points.shape[0]
+    visible = np.zeros(num_points, dtype=np.int32)
+    kept = np.zeros(num_points, dtype=np.int32)
+    if not cam_infos or num_points == 0:
+        return visible, kept
+
+    projections = stack_projections(cam_infos)
+    rotations = np.ascontiguousarray(projections[:, :, :3].transpose(0, 2, 1))
+    translations = projections[:, None, :, 3]
+
+    # Masks may differ in size, so they are read from one packed buffer and addressed by offset
+    if not isinstance(binary_masks, PackedMasks):
+        binary_masks = PackedMasks.from_masks({camera.image_name: binary_masks[camera.image_name]
+                                               for camera in cam_infos})
+    mask_idx = np.array([binary_masks.index[camera.image_name] for camera in cam_infos], dtype=np.int64)
+    heights = binary_masks.heights[mask_idx]
+    widths = binary_masks.widths[mask_idx]
+    height_bounds = heights.astype(np.float32)[:, None]
+    width_bounds = widths.astype(np.float32)[:, None]
+
+    # Per point: uvw, u, v and two bool buffers for every camera (22 bytes each), allocated once and
+    # reused by every chunk, plus the indices and pixel offsets of the visible pairs of one camera
+    num_cameras = len(cam_infos)
+    bytes_per_point = num_cameras * 22 + 80
+    chunk_size = max(1, min(num_points, int(memory_budget // bytes_per_point)))
+    uvw_buffer = np.empty(num_cameras * chunk_size * 3, dtype=np.float32)
+    u_buffer = np.empty(num_cameras * chunk_size, dtype=np.float32)
+    v_buffer = np.empty(num_cameras * chunk_size, dtype=np.float32)
+    within_buffer = np.empty(num_cameras * chunk_size, dtype=bool)
+    bounds_buffer = np.empty(num_cameras * chunk_size, dtype=bool)
+
+    for start in range(0, num_points, chunk_size):
+        end = min(start + chunk_size, num_points)
+        size = end - start
+        chunk = np.asarray(points[start:end], dtype=np.float32)
+        pixels_homogeneous = uvw_buffer[:num_cameras * size * 3].reshape(num_cameras, size, 3)
+        u = u_buffer[:num_cameras * size].reshape(num_cameras, size)
+        v = v_buffer[:num_cameras * size].reshape(num_cameras, size)
+        within_projection = within_buffer[:num_cameras * size].reshape(num_cameras, size)
+        in_bounds = bounds_buffer[:num_cameras * size].reshape(num_cameras, size)
+
+        np.matmul(chunk[None], rotations, out=pixels_homogeneous)
+        pixels_homogeneous += translations
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(pixels_homogeneous[..., 0], pixels_homogeneous[..., 2], out=u)
+            np.divide(pixels_homogeneous[..., 1], pixels_homogeneous[..., 2], out=v)
+        np.greater_equal(u, 0, out=within_projection)
+        within_projection &= np.less(u, width_bounds, out=in_bounds)
+        within_projection &= np.greater_equal(v, 0, out=in_bounds)
+        within_projection &= np.less(v, height_bounds, out=in_bounds)
+
+        np.sum(within_projection, axis=0, dtype=np.int32, out=visible[start:end])
+        chunk_kept = kept[start:end]
+        # One camera at a time, so the index arrays only ever hold the visible points of a single mask
+        for cam in range(num_cameras):
+            point_idx = np.flatnonzero(within_projection[cam])
+            pixel_idx = v[cam, point_idx].astype(np.int64)
+            pixel_idx *= widths[cam]
+            pixel_idx += u[cam, point_idx].astype(np.int64)
+            chunk_kept[point_idx[binary_masks.lookup(mask_idx[cam], pixel_idx) == 1]] += 1
+    return visible, kept
+
+
+def select_by_votes(visible, kept, vote_ratio=None):
+    """
+    Without vote_ratio a point survives only if every camera that sees it marks it foreground.
+    With vote_ratio in [0, 1] it survives if at least that fraction of those cameras do, so a
+    few bad masks no longer remove it. Points no camera sees are always kept.
+    """
+    if vote_ratio is None:
+        return kept == visible
+    return kept >= vote_ratio * visible
+
+
+def add_vote_properties(vertices, visible, kept):
+    """
+    Return a copy of the vertex table with the per-point counts appended as
+    'mask_visible' and 'mask_kept' scalar properties.
+    """
+    new_vertex_dtype = vertices.dtype.descr + [('mask_visible', 'i4'), ('mask_kept', 'i4')]
+    new_vertices = np.empty(len(vertices), dtype=new_vertex_dtype)
+    for name in vertices.dtype.names:
+        new_vertices[name] = vertices[name]
+    new_vertices['mask_visible'] = visible
+    new_vertices['mask_kept'] = kept
+    return new_vertices
+
+
+def carve_points(points, cam_infos, binary_masks, vote_ratio=None, memory_budget=256 * 1024 ** 2):
+    """
+    Apply every camera's mask to the same in-memory point set, see select_by_votes for how
+    vote_ratio is used. Cameras without a (non-empty) mask are skipped.
+    :return: bool keep-mask of shape (N,).
+    """
+    visible, kept = count_mask_votes(points, cam_infos, binary_masks, memory_budget)
+    keep = select_by_votes(visible, kept, vote_ratio)
+    num_cameras = sum(camera.image_name in binary_masks for camera in cam_infos)
+    print(f"{num_cameras} cameras, {keep.shape[0] - np.count_nonzero(keep)} points removed")
+    return keep
+
+
+def carve_point_cloud(vertices, cam_infos, binary_masks, vote_ratio=None, export_vote_counts=False,
+                      output_file_path=None, text=False, images_folder="images", mask_threshold=30,
+                      memory_budget=256 * 1024 ** 2):
+    """
+    Remove the background points of a point cloud / gaussian PLY.
+    :param vertices: structured vertex array, or path to a PLY file.
+    :param cam_infos: list of CameraInfo, or path to a COLMAP sparse folder.
+    :param binary_masks: dict of 0/1 masks / PackedMasks keyed by image name, or path to a mask folder.
+    :param vote_ratio: see select_by_votes.
+    :param export_vote_counts: append mask_visible / mask_kept to the returned vertices.
+    :param output_file_path: also write the result there when given.
+    :return: the carved structured vertex array.
+    """
+    if isinstance(vertices, (str, os.PathLike)):
+        vertices = load_vertices(vertices)
+    if isinstance(cam_infos, (str, os.PathLike)):
+        cam_infos = load_colmap_cameras(cam_infos, images_folder)
+    if isinstance(binary_masks, (str, os.PathLike)):
+        binary_masks = load_packed_masks(binary_masks, mask_threshold)
+
+    visible, kept = count_mask_votes(vertex_positions(vertices), cam_infos, binary_masks, memory_budget)
+    keep = select_by_votes(visible, kept, vote_ratio)
+    if export_vote_counts:
+        vertices = add_vote_properties(vertices, visible, kept)
+    vertices = vertices[keep]
+
+    if output_file_path is not None:
+        save_vertices(vertices, output_file_path, text=text)
+    return vertices
+
+
+def carve_mesh(mesh, cam_infos, binary_masks, vote_ratio=None, output_file_path=None, text=False,
+               images_folder="images", mask_threshold=30, memory_budget=256 * 1024 ** 2):
+    """
+    Remove the background of a triangle mesh.
+    :param mesh: (vertices, faces) tuple, or path to a PLY file.
+    :param cam_infos: list of CameraInfo, or path to a COLMAP sparse folder.
+    :param binary_masks: dict of 0/1 masks / PackedMasks keyed by image name, or path to a mask folder.
+    :param vote_ratio: see select_by_votes.
+    :param output_file_path: also write the result there when given.
+    :return: (vertices, faces) of the carved mesh.
+    """
+    vertices, faces = load_mesh(mesh) if isinstance(mesh, (str, os.PathLike)) else mesh
+    if isinstance(cam_infos, (str, os.PathLike)):
+        cam_infos = load_colmap_cameras(cam_infos, images_folder)
+    if isinstance(binary_masks, (str, os.PathLike)):
+        binary_masks = load_packed_masks(binary_masks, mask_threshold)
+
+    keep = carve_points(vertex_positions(vertices), cam_infos, binary_masks, vote_ratio, memory_budget)
+    vertices, faces = carve_mesh_arrays(vertices, faces, keep)
+
+    if output_file_path is not None:
+        save_mesh(vertices, faces, output_file_path, text=text)
+    return vertices, faces
@@ -0,0 +1,104 @@
+import os
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp')
+
+
+def composite(image, mask, mode='transparent'):
+    """
+    Cut the masked object out of a BGR image, all in whole-array operations.
+    mode='transparent': BGRA, object pixels opaque, everything where mask == 0 is (0, 0, 0, 0).
+    mode='alpha': BGRA with the mask itself as alpha channel.
+    mode='black': BGR image multiplied by mask / 255.
+    """
+    if mask.shape[:2] != image.shape[:2]:
+        mask = cv2.resize(mask, (image.shape[1], image.shape[0]))
+    if mode == 'black':
+        return (image.astype(np.float32) * (mask.astype(np.float32) / 255.0)[..., None]).astype(np.uint8)
+
+    rgba_image = np.empty((image.shape[0], image.shape[1], 4), dtype=np.uint8)
+    rgba_image[..., :3] = image
+    if mode == 'alpha':
+        rgba_image[..., 3] = mask
+    else:
+        rgba_image[..., 3] = 255
+        rgba_image[mask == 0] = 0
+    return rgba_image
+
+
+def save_image(output_path, image, fmt=None, compression=None):
+    """
+    Encode as fmt ('png', 'webp', 'jpg', ...; default taken from the file extension) and write to output_path.
+    compression is the PNG compression level (0-9) or the WebP/JPEG quality (WebP above 100 is lossless).
+    """
+    fmt = (fmt or os.path.splitext(output_path)[1][1:]).lower()
+    params = []
+    if compression is not None:
+        if fmt == 'png':
+            params = [cv2.IMWRITE_PNG_COMPRESSION, compression]
+        elif fmt == 'webp':
+            params = [cv2.IMWRITE_WEBP_QUALITY, compression]
+        elif fmt in ('jpg', 'jpeg'):
+            params = [cv2.IMWRITE_JPEG_QUALITY, compression]
+    ok, buffer = cv2.imencode('.' + fmt, image, params)
+    if not ok:
+        raise IOError(f"Failed to encode {output_path}")
+    buffer.tofile(output_path)
+
+
+def find_mask(masks_folder, image_name):
+    # Same file name first, then the same stem with any image extension
+    mask_path = os.path.join(masks_folder, image_name)
+    if os.path.isfile(mask_path):
+        return mask_path
+    stem = os.path.splitext(image_name)[0]
+    for ext in IMAGE_EXTENSIONS:
+        mask_path = os.path.join(masks_folder, stem + ext)
+        if os.path.isfile(mask_path):
+            return mask_path
+    return None
+
+
+def composite_file(image_path, mask_path, output_path, mode='transparent', fmt=None, compression=None):
+    image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+    if image is None or mask is None:
+        raise IOError(f"Failed to load {image_path if image is None else mask_path}")
+    save_image(output_path, composite(image, mask, mode), fmt, compression)
+    return output_path
+
+
+def composite_folder(images_folder, masks_folder, output_folder, mode='transparent', fmt=None,
+                     compression=None, workers=None, keep_name=False):
+    """
+    Composite every image of images_folder with the mask of the same name (any image extension)
+    on a thread pool. Output files keep the image stem with fmt as extension, or the full image
+    file name when keep_name is set.
+    :return: (list of written paths, dict of image name -> error for the images that failed).
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    jobs = {}
+    for image_name in sorted(os.listdir(images_folder)):
+        if not image_name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        mask_path = find_mask(masks_folder, image_name)
+        if mask_path is None:
+            print(f"No mask found for {image_name}")
+            continue
+        stem = os.path.splitext(image_name)[0]
+        output_name = image_name if keep_name or fmt is None else f"{stem}.{fmt}"
+        jobs[image_name] = (os.path.join(images_folder, image_name), mask_path, os.path.join(output_folder, output_name))
+
+    written, failed = [], {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {image_name: executor.submit(composite_file, *paths, mode, fmt, compression)
+                   for image_name, paths in jobs.items()}
+        for image_name, future in futures.items():
+            try:
+                written.append(future.result())
+            except Exception as e:
+                failed[image_name] = str(e)
+    return written, failed
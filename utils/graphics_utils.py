@@ -48,6 +48,40 @@ def getWorld2View2(R, t, translate=np.array([.0, .0, .0]), scale=1.0):
     Rt = np.linalg.inv(C2W)
     return np.float32(Rt)
 
+def getWorld2ViewBatch(R, t):
+    """
+    getWorld2View for N cameras at once: R (N, 3, 3), t (N, 3) -> (N, 4, 4) float32.
+    """
+    R = np.asarray(R).reshape(-1, 3, 3)
+    Rt = np.zeros((len(R), 4, 4))
+    Rt[:, :3, :3] = R.transpose(0, 2, 1)
+    Rt[:, :3, 3] = np.asarray(t).reshape(-1, 3)
+    Rt[:, 3, 3] = 1.0
+    return np.float32(Rt)
+
+def getWorld2View2Batch(R, t, translate=np.array([.0, .0, .0]), scale=1.0):
+    """
+    getWorld2View2 for N cameras at once: R (N, 3, 3), t (N, 3) -> (N, 4, 4) float32.
+    """
+    R = np.asarray(R).reshape(-1, 3, 3)
+    Rt = np.zeros((len(R), 4, 4))
+    Rt[:, :3, :3] = R.transpose(0, 2, 1)
+    Rt[:, :3, 3] = np.asarray(t).reshape(-1, 3)
+    Rt[:, 3, 3] = 1.0
+
+    C2W = np.linalg.inv(Rt)
+    cam_center = C2W[:, :3, 3]
+    cam_center = (cam_center + translate) * scale
+    C2W[:, :3, 3] = cam_center
+    Rt = np.linalg.inv(C2W)
+    return np.float32(Rt)
+
+def getCameraCenters(R, t):
+    """
+    World positions (N, 3) of N cameras, computed as the camera centers in getNerfppNorm.
+    """
+    return np.linalg.inv(getWorld2View2Batch(R, t))[:, :3, 3]
+
 def getProjectionMatrix(znear, zfar, fovX, fovY):
     tanHalfFovY = math.tan((fovY / 2))
     tanHalfFovX = math.tan((fovX / 2))